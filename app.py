@@ -1,8 +1,12 @@
+import atexit
+import functools
+import json
 import logging
 import os
 import traceback
-from typing import Any, List, Text, Union
+from typing import TYPE_CHECKING, Any, List, Text, Union
 
+import plotly
 import requests
 from azure.identity import DefaultAzureCredential
 from azure.keyvault.secrets import SecretClient
@@ -13,164 +17,305 @@ from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.wrappers import Response
 
 import config
+from src.models.AppSettings import AppSettings
 from src.utils.auth import Auth, login_required
+from src.utils.CacheRefresher import CacheRefresher
+from src.utils.CompressionMiddleware import CompressionMiddleware
 from src.utils.DataLoader import DataLoader
 from src.utils.environment import get_variables
+from src.utils.JobQueue import JobQueue
+from src.utils.VendorAssets import VendorAssets
 from views.DashApp import DashApp
+from views.DashAppRegistry import DashAppRegistry
 from views.IrisExample import IrisExample
 
-credential = DefaultAzureCredential(
-    exclude_visual_studio_code_credential=True,
-    exclude_shared_token_cache_credential=True,
-)
-secret_client = SecretClient(
-    vault_url=os.environ["KEYVAULT_URI"], credential=credential
-)
-
-if os.getenv("IS_PROD"):
-    logger = logging.getLogger(__name__)
-    logger.addHandler(
-        AzureLogHandler(
-            connection_string=os.environ.get("APPLICATIONINSIGHTS_CONNECTION_STRING")
-        )
-    )
+if TYPE_CHECKING:
+    from azure.identity.aio import DefaultAzureCredential as AsyncDefaultAzureCredential
 
-app_settings = get_variables(secret_client)
-
-data_loader = DataLoader(credential)
-
-app = Flask(__name__, template_folder="html_templates", static_folder="assets")
-app.config.from_object(
-    config
-)  # This is needed by flask session to access the "SESSION_TYPE" config value
-Session(app)
-
-for _, value in config.data_files.items():
-    if "account_url" not in value:
-        value[
-            "account_url"
-        ] = f"https://{app_settings.storage_name}.blob.core.windows.net"
-
-# Extend this list with more dash apps
-dash_apps: List[DashApp] = [
-    IrisExample(
-        config.DASH_URL_BASE + "iris-example/",
-        {
-            "name": "Iris Example",
-        },
-        data_loader,
-        {
-            "iris": config.data_files["iris"],
-        },
-    ),
-]
-
-auth = Auth(app_settings, secret_client)
-
-app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)  # type: ignore
-
-for dash_app in dash_apps:
-    dash_app.initialize(app)
-    for view_func in dash_app.app.server.view_functions:
-        dash_app.app.server.view_functions[view_func] = login_required(
-            auth, app_settings.roles, config.SCOPES
-        )(dash_app.app.server.view_functions[view_func])
-
-
-@app.route("/")
-@login_required(auth, app_settings.roles, config.SCOPES)
-def index() -> Text:
-    if "flow" not in session:
-        session["flow"] = auth._build_auth_code_flow(scopes=config.SCOPES)
-        session["user"] = session.get("id_token_claims")
-    name = ""
-    if session is not None and "user" in session and session["user"] is not None:
-        name = session["user"]["name"].split(" ")[0]
-    return render_template(
-        "index.html",
-        auth_url=session["flow"]["auth_uri"],
-        name=name,
+    from src.utils.AsyncDataLoader import SyncDataLoader
+
+
+def _credential() -> DefaultAzureCredential:
+    return DefaultAzureCredential(
+        exclude_visual_studio_code_credential=True,
+        exclude_shared_token_cache_credential=True,
     )
 
 
-@app.route("/test")
-@login_required(auth, app_settings.roles, config.SCOPES)
-def test() -> Any:
-    token = auth._get_token_from_cache(config.SCOPES)
-    graph_data = requests.get(
-        "http://localhost:5001/api",
-        headers={"Authorization": "Bearer " + token["access_token"]},
-    ).json()
-    return graph_data
-
-
-@app.route("/menu")
-@login_required(auth, app_settings.roles, config.SCOPES)
-def menu() -> Text:
-    return render_template(
-        "menu.html",
-        name=session["user"]["name"],
-        dash_apps=dash_apps,
+def _async_credential() -> "AsyncDefaultAzureCredential":
+    # Only imported by the async data loader, see _create_data_loader
+    from azure.identity.aio import DefaultAzureCredential as AsyncDefaultAzureCredential
+
+    return AsyncDefaultAzureCredential(
+        exclude_visual_studio_code_credential=True,
+        exclude_shared_token_cache_credential=True,
     )
 
 
-@app.route("/not_signed_in")
-def not_signed_in() -> Text:
-    session["flow"] = auth._build_auth_code_flow(scopes=config.SCOPES)
-    return render_template("not_signed_in.html", auth_url=session["flow"]["auth_uri"])
+def _create_data_loader(
+    credential: DefaultAzureCredential,
+) -> Union[DataLoader, "SyncDataLoader"]:
+    if config.DATA_LOADER == "async":
+        # Needs aiohttp, installed with the "async" extra
+        from src.utils.AsyncDataLoader import AsyncDataLoader, SyncDataLoader
+
+        return SyncDataLoader(
+            AsyncDataLoader(
+                _async_credential(),
+                config.CACHE_DIR,
+                config.CACHE_CODEC,
+                config.MEMORY_CACHE_BYTES,
+                config.BLOB_TRANSPORT,
+                config.DOWNLOAD_CONCURRENCY,
+                config.MAX_PARALLEL_FILES,
+                config.CACHE_REFRESH,
+                config.LOCAL_STORAGE_ROOT,
+                config.FRAME_CACHE_DIR,
+            )
+        )
+    else:
+        return DataLoader(
+            credential,
+            config.CACHE_DIR,
+            config.CACHE_CODEC,
+            config.MEMORY_CACHE_BYTES,
+            config.BLOB_TRANSPORT,
+            config.DOWNLOAD_CONCURRENCY,
+            config.MAX_PARALLEL_FILES,
+            config.CACHE_REFRESH,
+            config.LOCAL_STORAGE_ROOT,
+            config.FRAME_CACHE_DIR,
+        )
 
 
-@app.route("/access_denied")
-def access_denied() -> Text:
-    return render_template("access_denied.html")
+def create_app(preload: bool = False) -> Flask:
+    """Create the Flask app with the Dash apps mounted on it.
 
+    With preload, as with `gunicorn --preload`, the app is created once before the
+    worker processes are forked and shared by them copy-on-write, including the
+    data of the Dash apps in PRELOAD_DASH_APPS. The threads, credentials and HTTP
+    clients every process needs of its own are then created by the function in
+    app.extensions["post_fork"], which gunicorn.conf.py calls in every worker.
+    """
+    credential = _credential()
+    secret_client = SecretClient(
+        vault_url=os.environ["KEYVAULT_URI"], credential=credential
+    )
 
-@app.route(app_settings.redirect_path)
-def authorized() -> Union[Text, Any]:
-    try:
-        cache = auth._load_cache()
-        result = auth._build_msal_app(cache=cache).acquire_token_by_auth_code_flow(
-            session.get("flow", {}), request.args
+    app_settings = get_variables(secret_client)
+    auth = Auth(app_settings, secret_client, config.AUTH_VERDICT_TTL)
+    secret_client.close()
+
+    data_loader = _create_data_loader(credential)
+    atexit.register(data_loader.close)
+
+    app = Flask(__name__, template_folder="html_templates", static_folder="assets")
+    app.config.from_object(
+        config
+    )  # This is needed by flask session to access the "SESSION_TYPE" config value
+    Session(app)
+
+    for _, value in config.data_files.items():
+        if "account_url" not in value:
+            value[
+                "account_url"
+            ] = f"https://{app_settings.storage_name}.blob.core.windows.net"
+
+    cache_refresher = None
+    if config.CACHE_REFRESH:
+        cache_refresher = CacheRefresher(
+            data_loader, config.data_files, config.CACHE_REFRESH_INTERVAL
         )
-        if "error" in result:
-            return render_template("auth_error.html", result=result)
-        session["user"] = result.get("id_token_claims")
-        auth._save_cache(cache)
-    except:  # noqa: E722
-        return render_template(
-            "auth_error.html",
-            result={
-                "error": "Exception",
-                "error_description": traceback.format_exc(),
+
+    # Stylesheets and fonts served from assets/vendor instead of their CDNs
+    vendor_assets = VendorAssets(os.path.join(app.root_path, "assets", "vendor"))
+    vendor_assets.init_app(app)
+
+    # Slow callbacks run here instead of in the request, see DashApp.background_callback
+    job_queue = JobQueue(
+        config.JOB_DIR,
+        config.JOB_WORKERS,
+        encode=functools.partial(json.dumps, cls=plotly.utils.PlotlyJSONEncoder),
+    )
+    atexit.register(job_queue.close)
+
+    # Extend this list with more dash apps
+    dash_apps: List[DashApp] = [
+        IrisExample(
+            config.DASH_URL_BASE + "iris-example/",
+            {
+                "name": "Iris Example",
+                "callback_cache_size": config.CALLBACK_CACHE_SIZE,
+                "callback_cache_dir": config.CALLBACK_CACHE_DIR,
+                "webgl_threshold": config.WEBGL_THRESHOLD,
+                "max_points": config.MAX_POINTS,
+                "job_queue": job_queue,
+                "job_poll_interval": config.JOB_POLL_INTERVAL,
+                "inline_layout": config.INLINE_LAYOUT,
+                "vendor_assets": (
+                    vendor_assets if config.STATIC_ASSETS == "local" else None
+                ),
             },
-        )
-    return redirect(url_for("index"))
+            data_loader,
+            {
+                "iris": config.data_files["iris"],
+            },
+        ),
+    ]
 
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)  # type: ignore
 
-@app.route("/logout")
-def logout() -> Response:
-    session.clear()
-    return redirect(
-        app_settings.authority
-        + "/oauth2/v2.0/logout"
-        + "?post_logout_redirect_uri="
-        + url_for("index", _external=True)
+    # Dash apps are built on their first request, or here with their data if listed
+    # in PRELOAD_DASH_APPS
+    dash_app_registry = DashAppRegistry(
+        app, login_required(auth, app_settings.roles, config.SCOPES)
     )
+    for dash_app in dash_apps:
+        preload_dash_app = dash_app.url_base in config.PRELOAD_DASH_APPS
+        dash_app_registry.register(dash_app, preload_dash_app)
+        if preload_dash_app:
+            dash_app.refresh_data()
+
+    if config.COMPRESSION:
+        compression = CompressionMiddleware(
+            app.wsgi_app,  # type: ignore
+            config.COMPRESSION_MIN_SIZE,
+            url_bases=tuple(dash_app.url_base for dash_app in dash_apps),
+            static_cache_bytes=config.COMPRESSION_CACHE_BYTES,
+        )
+        # Static files are compressed once here instead of on every request
+        compression.precompress("/assets/", os.path.join(app.root_path, "assets"))
+        compression.precompress(vendor_assets.url(""), vendor_assets.directory)
+        for dash_app in dash_apps:
+            compression.precompress(
+                dash_app.url_base + "assets/", os.path.join(app.root_path, "assets")
+            )
+        app.wsgi_app = compression  # type: ignore
+
+    def start_process() -> None:
+        # Threads are not copied into forked processes, so they are started per process
+        if os.getenv("IS_PROD"):
+            logger = logging.getLogger(__name__)
+            logger.addHandler(
+                AzureLogHandler(
+                    connection_string=os.environ.get(
+                        "APPLICATIONINSIGHTS_CONNECTION_STRING"
+                    )
+                )
+            )
+        if cache_refresher is not None:
+            cache_refresher.start()
+            atexit.register(cache_refresher.stop)
+
+    def post_fork() -> None:
+        if isinstance(data_loader, DataLoader):
+            data_loader.after_fork(_credential())
+        else:
+            data_loader.after_fork(_async_credential())
+        job_queue.after_fork()
+        start_process()
+
+    if preload:
+        app.extensions["post_fork"] = post_fork
+    else:
+        start_process()
+
+    _register_routes(app, auth, app_settings, dash_apps)
+
+    return app
+
+
+def _register_routes(
+    app: Flask, auth: Auth, app_settings: AppSettings, dash_apps: List[DashApp]
+) -> None:
+    @app.route("/")
+    @login_required(auth, app_settings.roles, config.SCOPES)
+    def index() -> Text:
+        if "flow" not in session:
+            session["flow"] = auth._build_auth_code_flow(scopes=config.SCOPES)
+            session["user"] = session.get("id_token_claims")
+        name = ""
+        if session is not None and "user" in session and session["user"] is not None:
+            name = session["user"]["name"].split(" ")[0]
+        return render_template(
+            "index.html",
+            auth_url=session["flow"]["auth_uri"],
+            name=name,
+        )
+
+    @app.route("/test")
+    @login_required(auth, app_settings.roles, config.SCOPES)
+    def test() -> Any:
+        token = auth._get_token_from_cache(config.SCOPES)
+        graph_data = requests.get(
+            "http://localhost:5001/api",
+            headers={"Authorization": "Bearer " + token["access_token"]},
+        ).json()
+        return graph_data
+
+    @app.route("/menu")
+    @login_required(auth, app_settings.roles, config.SCOPES)
+    def menu() -> Text:
+        return render_template(
+            "menu.html",
+            name=session["user"]["name"],
+            dash_apps=dash_apps,
+        )
 
+    @app.route("/not_signed_in")
+    def not_signed_in() -> Text:
+        session["flow"] = auth._build_auth_code_flow(scopes=config.SCOPES)
+        return render_template(
+            "not_signed_in.html", auth_url=session["flow"]["auth_uri"]
+        )
 
-@app.route("/graphcall")
-@login_required(auth, app_settings.roles, config.SCOPES)
-def graphcall() -> Text:
-    token = auth._get_token_from_cache(config.SCOPES)
-    graph_data = requests.get(
-        config.ENDPOINT,
-        headers={"Authorization": "Bearer " + token["access_token"]},
-    ).json()
-    return render_template("display.html", result=graph_data)
+    @app.route("/access_denied")
+    def access_denied() -> Text:
+        return render_template("access_denied.html")
+
+    @app.route(app_settings.redirect_path)
+    def authorized() -> Union[Text, Any]:
+        try:
+            cache = auth._load_cache()
+            result = auth._build_msal_app(cache=cache).acquire_token_by_auth_code_flow(
+                session.get("flow", {}), request.args
+            )
+            if "error" in result:
+                return render_template("auth_error.html", result=result)
+            session["user"] = result.get("id_token_claims")
+            auth._save_cache(cache)
+        except:  # noqa: E722
+            return render_template(
+                "auth_error.html",
+                result={
+                    "error": "Exception",
+                    "error_description": traceback.format_exc(),
+                },
+            )
+        return redirect(url_for("index"))
+
+    @app.route("/logout")
+    def logout() -> Response:
+        session.clear()
+        return redirect(
+            app_settings.authority
+            + "/oauth2/v2.0/logout"
+            + "?post_logout_redirect_uri="
+            + url_for("index", _external=True)
+        )
 
+    @app.route("/graphcall")
+    @login_required(auth, app_settings.roles, config.SCOPES)
+    def graphcall() -> Text:
+        token = auth._get_token_from_cache(config.SCOPES)
+        graph_data = requests.get(
+            config.ENDPOINT,
+            headers={"Authorization": "Bearer " + token["access_token"]},
+        ).json()
+        return render_template("display.html", result=graph_data)
 
-app.jinja_env.globals.update(_build_auth_code_flow=auth._build_auth_code_flow)
+    app.jinja_env.globals.update(_build_auth_code_flow=auth._build_auth_code_flow)
 
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0")
+    create_app().run(host="0.0.0.0")
@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 # The absolute URL must match the redirect URI you set
 # in the app's registration in the Azure portal.
 ENDPOINT = (
@@ -7,14 +9,95 @@ SCOPES = ["User.ReadBasic.All"]
 SESSION_TYPE = (
     "filesystem"  # Specifies the token cache should be stored in server-side session
 )
+# Seconds a successful token check of a session is trusted before it is checked again
+AUTH_VERDICT_TTL = 60
 
 DASH_URL_BASE = "/views/"
+# Dash apps are built on the first request under their url_base. List the url_base of
+# apps to build at startup instead, e.g. DASH_URL_BASE + "iris-example/"
+PRELOAD_DASH_APPS: List[str] = []
 
 # Data files
 # Add the "account_url" here manually if you want to use another storage account than the default.
+# "ttl" is the number of seconds a cached file is served without checking the datastore.
+# Set "backend": "local" to read <LOCAL_STORAGE_ROOT>/<container>/<filename> instead of
+# Azure Blob Storage, e.g. to run and benchmark the dashboards offline.
+# Set "format": "parquet" for Parquet files. They are read with byte-range requests, and
+# "columns": [...] and "filters": [("date", ">=", "2022-01-01"), ...] limit the download
+# to the needed columns and the row groups whose min/max statistics may match.
 data_files = {
     "iris": {
         "container": "test",
         "filename": "iris.csv",
+        "ttl": 300,
     }
 }
+
+# "sync" uses a thread per download, "async" shares one event loop for all downloads.
+# The async loader requires aiohttp, install it with: poetry install -E async
+DATA_LOADER = "sync"
+
+LOCAL_STORAGE_ROOT = "data"
+
+# Blob cache, one entry per file is stored in CACHE_DIR
+CACHE_DIR = "cache"
+CACHE_CODEC = "lz4"  # "none", "gzip" or "lz4"
+# Parsed DataFrames are stored as memory-mapped Arrow files in FRAME_CACHE_DIR, which
+# all worker processes share. None stores them in CACHE_DIR/frames. A directory in
+# /dev/shm, e.g. "/dev/shm/dash-frames", keeps them in memory, but then /dev/shm must
+# be large enough to hold all datasets: Docker limits it to 64 MB unless started with
+# a larger --shm-size.
+FRAME_CACHE_DIR: Optional[str] = None
+# Size budget of the in-memory cache in front of CACHE_DIR, per process
+MEMORY_CACHE_BYTES = 256 * 1024 * 1024
+
+# Keep-alive HTTP connection pool and download chunking used for each storage account
+BLOB_TRANSPORT = {
+    "pool_connections": 10,
+    "pool_maxsize": 20,
+    "connection_timeout": 20,
+    "read_timeout": 120,
+    "max_single_get_size": 32 * 1024 * 1024,
+    "max_chunk_get_size": 4 * 1024 * 1024,
+}
+# Prefetch data_files at startup and keep them fresh from a background thread.
+# Each file is revalidated every "ttl" seconds, or CACHE_REFRESH_INTERVAL if it has none,
+# and requests are served the last good copy while a refresh is running.
+CACHE_REFRESH = False
+CACHE_REFRESH_INTERVAL = 300
+# Parallel byte-range requests per large blob
+DOWNLOAD_CONCURRENCY = 4
+# Files downloaded at the same time by DataLoader.get_many
+MAX_PARALLEL_FILES = 8
+
+# Outputs of memoized callbacks kept in memory per callback, and the directory of the
+# disk tier shared by all worker processes, None to only cache in memory
+CALLBACK_CACHE_SIZE = 128
+CALLBACK_CACHE_DIR = "cache/callbacks"
+
+# Scatter plots with more points than this are rendered with WebGL (Scattergl)
+WEBGL_THRESHOLD = 10000
+# Points per trace sent to the browser, larger data is downsampled on the server for the
+# visible range and re-fetched in more detail when zooming
+MAX_POINTS = 5000
+
+# Data loading and heavy callbacks run as jobs, at most JOB_WORKERS at a time on each
+# instance, while the browser polls for the result every JOB_POLL_INTERVAL milliseconds
+JOB_DIR = "cache/jobs"
+JOB_WORKERS = 2
+JOB_POLL_INTERVAL = 500
+
+# Render the page with its data in the first response when the data is already loaded,
+# instead of a placeholder that is filled in by a second request
+INLINE_LAYOUT = True
+
+# Compress responses of at least COMPRESSION_MIN_SIZE bytes with brotli or gzip
+COMPRESSION = True
+COMPRESSION_MIN_SIZE = 500
+# Memory for the compressed static files, the least recently used ones are dropped
+COMPRESSION_CACHE_BYTES = 64 * 1024 * 1024
+
+# "local" serves the stylesheets and fonts of the Dash apps from assets/vendor with
+# immutable cache headers, "cdn" loads them from their CDNs. Fetch the local copies
+# with: python -m scripts.vendor_assets
+STATIC_ASSETS = "local"
@@ -0,0 +1,25 @@
+"""Gunicorn settings, read from the working directory when gunicorn starts.
+
+The app is created once in the master process and forked into the workers, which
+share its memory copy-on-write. post_worker_init then gives each worker its own
+credentials, HTTP clients and threads.
+"""
+
+import os
+from typing import Any
+
+wsgi_app = "app:create_app(preload=True)"
+bind = "0.0.0.0:5000"
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+# Requests mostly wait on storage and job polling, so each worker serves several
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = 120
+preload_app = True
+
+
+def post_worker_init(worker: Any) -> None:
+    # Runs in the worker after it was forked, with the app it loaded or inherited
+    post_fork = getattr(worker.wsgi, "extensions", {}).get("post_fork")
+    if post_fork is not None:
+        post_fork()
@@ -0,0 +1,67 @@
+"""Download the stylesheets used by the Dash apps, and the fonts they reference,
+into assets/vendor so they can be served locally.
+
+Run from the repository root with: python -m scripts.vendor_assets
+"""
+
+import re
+import sys
+import urllib.request
+from pathlib import Path
+from typing import Dict
+from urllib.parse import urljoin, urlsplit
+
+from src.utils.VendorAssets import VENDOR_STYLESHEETS
+
+VENDOR_DIR = Path("assets/vendor")
+CSS_URL = re.compile(r"url\(\s*['\"]?([^'\")]+)['\"]?\s*\)")
+
+
+def download(url: str) -> bytes:
+    print(f"Downloading {url}")
+    with urllib.request.urlopen(url, timeout=60) as response:
+        return response.read()
+
+
+def is_vendored(path: Path) -> bool:
+    return VENDOR_DIR.resolve() in path.resolve().parents
+
+
+def vendor_stylesheet(cdn_url: str, path: str) -> None:
+    css_path = VENDOR_DIR / path
+    css = download(cdn_url).decode("utf-8")
+    fetched: Dict[str, str] = {}
+
+    def localize(match: "re.Match[str]") -> str:
+        reference = urlsplit(match.group(1))
+        if reference.scheme == "data":
+            return match.group(0)
+        url = urljoin(cdn_url, match.group(1)).split("?")[0].split("#")[0]
+        if url not in fetched:
+            local = reference.path
+            target = css_path.parent / local
+            if reference.netloc or local.startswith("/") or not is_vendored(target):
+                # Files on other hosts or outside the stylesheet's directory tree
+                # are stored next to the stylesheet
+                local = "fonts/" + reference.path.rsplit("/", 1)[-1]
+                target = css_path.parent / local
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(download(url))
+            fetched[url] = local
+        query = f"?{reference.query}" if reference.query else ""
+        fragment = f"#{reference.fragment}" if reference.fragment else ""
+        return f"url({fetched[url]}{query}{fragment})"
+
+    css = CSS_URL.sub(localize, css)
+    css_path.parent.mkdir(parents=True, exist_ok=True)
+    css_path.write_text(css, encoding="utf-8")
+
+
+def main() -> int:
+    for cdn_url, path in VENDOR_STYLESHEETS:
+        vendor_stylesheet(cdn_url, path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
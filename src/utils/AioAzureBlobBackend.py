@@ -0,0 +1,194 @@
+import asyncio
+from typing import Any, Awaitable, Dict, List, Optional, TypeVar
+
+from azure.core import MatchConditions
+from azure.core.exceptions import HttpResponseError, ResourceModifiedError
+from azure.identity.aio import DefaultAzureCredential
+from azure.storage.blob.aio import BlobClient, BlobServiceClient
+
+from src.utils.AzureBlobBackend import download_info
+from src.utils.StorageBackend import (
+    BlobChangedError,
+    BlobHandle,
+    BlobInfo,
+    Download,
+    StorageBackend,
+)
+
+T = TypeVar("T")
+
+
+class AioAzureBlobHandle(BlobHandle):
+    def __init__(
+        self,
+        backend: "AioAzureBlobBackend",
+        account_url: str,
+        container: str,
+        name: str,
+    ) -> None:
+        super().__init__(name)
+        self.backend = backend
+        self.account_url = account_url
+        self.container = container
+
+    def _client(self) -> BlobClient:
+        return self.backend.get_blob_client(self.account_url, self.container, self.name)
+
+    async def _download(self, **kwargs: Any) -> Download:
+        downloader = await self._client().download_blob(
+            max_concurrency=self.backend.download_concurrency, **kwargs
+        )
+        return Download(
+            download_info(downloader),
+            lambda: self.backend.run(downloader.readall()),
+        )
+
+    def download(
+        self, offset: Optional[int] = None, length: Optional[int] = None
+    ) -> Download:
+        return self.backend.run(self._download(offset=offset, length=length))
+
+    def download_if_modified(
+        self, etag: str, offset: Optional[int] = None, length: Optional[int] = None
+    ) -> Optional[Download]:
+        try:
+            return self.backend.run(
+                self._download(
+                    offset=offset,
+                    length=length,
+                    etag=etag,
+                    match_condition=MatchConditions.IfModified,
+                )
+            )
+        except HttpResponseError as error:
+            if error.status_code != 304:
+                raise
+            return None
+
+    def read_range(self, offset: int, length: int, etag: Optional[str] = None) -> bytes:
+        async def read_range() -> bytes:
+            conditions: Dict[str, Any] = {}
+            if etag is not None:
+                conditions = {
+                    "etag": etag,
+                    "match_condition": MatchConditions.IfNotModified,
+                }
+            downloader = await self._client().download_blob(
+                offset=offset,
+                length=length,
+                max_concurrency=self.backend.download_concurrency,
+                **conditions,
+            )
+            return await downloader.readall()
+
+        try:
+            return self.backend.run(read_range())
+        except ResourceModifiedError as error:
+            raise BlobChangedError(str(error)) from error
+
+    def get_properties(self) -> BlobInfo:
+        properties = self.backend.run(self._client().get_blob_properties())
+        return BlobInfo(properties.etag, properties.last_modified, properties.size)
+
+
+class AioAzureBlobBackend(StorageBackend):
+    """Azure Blob Storage on the asyncio SDK, used from threads outside its loop.
+
+    The requests of all threads are sent from one event loop, set in loop before
+    first use, and share one aiohttp connection pool per account URL. The blocking
+    methods wait for their request, so they must not be called from the loop.
+    Requires aiohttp, installed with the "async" extra.
+    """
+
+    def __init__(
+        self,
+        credential: DefaultAzureCredential,
+        transport_settings: Optional[Dict[str, int]] = None,
+        download_concurrency: int = 4,
+    ) -> None:
+        self.credential = credential
+        self.transport_settings = {
+            "pool_maxsize": 10,
+            "connection_timeout": 20,
+            "read_timeout": 60,
+            "max_single_get_size": 32 * 1024 * 1024,
+            "max_chunk_get_size": 4 * 1024 * 1024,
+            **(transport_settings or {}),
+        }
+        self.download_concurrency = download_concurrency
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        # Only used on the loop, so it needs no lock
+        self._clients: Dict[str, BlobServiceClient] = {}
+
+    def run(self, coroutine: Awaitable[T]) -> T:
+        """Run coroutine on the loop and wait for its result."""
+        if self.loop is None:
+            raise RuntimeError("AioAzureBlobBackend.loop is not set")
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()  # type: ignore
+
+    def _get_service_client(self, account_url: str) -> BlobServiceClient:
+        client = self._clients.get(account_url)
+        if client is None:
+            # aiohttp is an optional dependency, installed with the "async" extra
+            import aiohttp
+            from azure.core.pipeline.transport import AioHttpTransport
+
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.transport_settings["pool_maxsize"]
+                )
+            )
+            client = BlobServiceClient(
+                account_url=account_url,
+                credential=self.credential,
+                transport=AioHttpTransport(
+                    session=session,
+                    session_owner=True,
+                    connection_timeout=self.transport_settings["connection_timeout"],
+                    read_timeout=self.transport_settings["read_timeout"],
+                ),
+                max_single_get_size=self.transport_settings["max_single_get_size"],
+                max_chunk_get_size=self.transport_settings["max_chunk_get_size"],
+            )
+            self._clients[account_url] = client
+        return client
+
+    def get_blob_client(
+        self, account_url: str, container: str, filename: str
+    ) -> BlobClient:
+        """A client for a blob, only to be called on the loop."""
+        return (
+            self._get_service_client(account_url)
+            .get_container_client(container)
+            .get_blob_client(filename)
+        )
+
+    def get_blob(self, account_url: str, container: str, filename: str) -> BlobHandle:
+        return AioAzureBlobHandle(self, account_url, container, filename)
+
+    def list(self, account_url: str, container: str, prefix: str = "") -> List[str]:
+        async def list_blobs() -> List[str]:
+            container_client = self._get_service_client(
+                account_url
+            ).get_container_client(container)
+            return [
+                blob.name
+                async for blob in container_client.list_blobs(
+                    name_starts_with=prefix or None
+                )
+            ]
+
+        return self.run(list_blobs())
+
+    def after_fork(self, credential: DefaultAzureCredential) -> None:
+        """Drop the clients bound to the event loop of the parent process."""
+        self.credential = credential
+        self.loop = None
+        self._clients = {}
+
+    async def aclose(self) -> None:
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.close()
+        await self.credential.close()
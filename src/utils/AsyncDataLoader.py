@@ -0,0 +1,173 @@
+import asyncio
+import functools
+import threading
+from typing import Any, Awaitable, Dict, List, Optional, TypeVar
+
+import pandas as pd
+from azure.identity.aio import DefaultAzureCredential
+
+from src.utils.AioAzureBlobBackend import AioAzureBlobBackend
+from src.utils.BufferReader import BufferReader
+from src.utils.DataLoader import DataLoader
+
+T = TypeVar("T")
+
+
+class AsyncDataLoader:
+    """DataLoader for asyncio code, sending its azure requests from the event loop.
+
+    Wraps a DataLoader whose "azure" backend is an AioAzureBlobBackend, so it
+    shares its cache entries and logic. The cache and parsing work runs in the
+    default executor, while the requests of all threads share the aiohttp
+    connection pools on the event loop. Use it from a single event loop.
+
+    Requires aiohttp, installed with the "async" extra.
+    """
+
+    def __init__(
+        self,
+        credential: DefaultAzureCredential,
+        cache_dir: str = "cache",
+        cache_codec: str = "lz4",
+        memory_cache_bytes: int = 256 * 1024 * 1024,
+        transport_settings: Optional[Dict[str, int]] = None,
+        download_concurrency: int = 4,
+        max_parallel_files: int = 8,
+        stale_while_revalidate: bool = False,
+        local_root: str = "data",
+        frame_cache_dir: Optional[str] = None,
+    ):
+        self.azure = AioAzureBlobBackend(
+            credential, transport_settings, download_concurrency
+        )
+        self.loader = DataLoader(
+            None,
+            cache_dir,
+            cache_codec,
+            memory_cache_bytes,
+            transport_settings,
+            download_concurrency,
+            max_parallel_files,
+            stale_while_revalidate,
+            local_root,
+            frame_cache_dir,
+            backends={"azure": self.azure},
+        )
+
+    def after_fork(self, credential: DefaultAzureCredential) -> None:
+        """Drop the clients and threads of the parent process."""
+        self.azure.after_fork(credential)
+        self.loader.after_fork(None)
+
+    async def close(self) -> None:
+        await self._run_blocking(self.loader.close)
+        await self.azure.aclose()
+
+    async def __aenter__(self) -> "AsyncDataLoader":
+        return self
+
+    async def __aexit__(self, *args: Optional[Any]) -> None:
+        await self.close()
+
+    async def _run_blocking(self, func: Any, *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        if self.azure.loop is None:
+            self.azure.loop = loop
+        return await loop.run_in_executor(
+            None, functools.partial(func, *args, **kwargs)
+        )
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self.loader.cache_stats()
+
+    async def refresh(self, *args: Any, **kwargs: Any) -> None:
+        """See DataLoader.refresh."""
+        await self._run_blocking(self.loader.refresh, *args, **kwargs)
+
+    async def version(self, *args: Any, **kwargs: Any) -> str:
+        """See DataLoader.version."""
+        return await self._run_blocking(self.loader.version, *args, **kwargs)
+
+    async def list(self, *args: Any, **kwargs: Any) -> List[str]:
+        """See DataLoader.list."""
+        return await self._run_blocking(self.loader.list, *args, **kwargs)
+
+    async def get(self, *args: Any, **kwargs: Any) -> BufferReader:
+        """See DataLoader.get."""
+        return await self._run_blocking(self.loader.get, *args, **kwargs)
+
+    async def get_many(self, *args: Any, **kwargs: Any) -> Dict[str, BufferReader]:
+        """See DataLoader.get_many."""
+        return await self._run_blocking(self.loader.get_many, *args, **kwargs)
+
+    async def get_dataframe(self, *args: Any, **kwargs: Any) -> pd.DataFrame:
+        """See DataLoader.get_dataframe."""
+        return await self._run_blocking(self.loader.get_dataframe, *args, **kwargs)
+
+
+class SyncDataLoader:
+    """Blocking facade over an AsyncDataLoader.
+
+    Offers get, get_many, get_dataframe, list, refresh and version like
+    DataLoader, but not its streaming methods open and iter_chunks.
+
+    All requests are sent from one event loop running in a background thread, so
+    the request threads share its connection pools.
+    """
+
+    def __init__(self, loader: AsyncDataLoader) -> None:
+        self.loader = loader
+        self._start()
+
+    def _start(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="AsyncDataLoader", daemon=True
+        )
+        self._thread.start()
+        self.loader.azure.loop = self._loop
+
+    def after_fork(self, credential: DefaultAzureCredential) -> None:
+        """Give a forked child process its own event loop, credential and clients.
+
+        The thread running the loop of the parent process does not exist in the
+        child, so a new loop is started.
+        """
+        self.loader.after_fork(credential)
+        self._start()
+
+    def _run(self, coroutine: Awaitable[T]) -> T:
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()  # type: ignore
+
+    def close(self) -> None:
+        if self._loop.is_running():
+            self._run(self.loader.close())
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+    def __enter__(self) -> "SyncDataLoader":
+        return self
+
+    def __exit__(self, *args: Optional[Any]) -> None:
+        self.close()
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self.loader.cache_stats()
+
+    def refresh(self, *args: Any, **kwargs: Any) -> None:
+        self._run(self.loader.refresh(*args, **kwargs))
+
+    def version(self, *args: Any, **kwargs: Any) -> str:
+        return self._run(self.loader.version(*args, **kwargs))
+
+    def list(self, *args: Any, **kwargs: Any) -> List[str]:
+        return self._run(self.loader.list(*args, **kwargs))
+
+    def get(self, *args: Any, **kwargs: Any) -> BufferReader:
+        return self._run(self.loader.get(*args, **kwargs))
+
+    def get_many(self, *args: Any, **kwargs: Any) -> Dict[str, BufferReader]:
+        return self._run(self.loader.get_many(*args, **kwargs))
+
+    def get_dataframe(self, *args: Any, **kwargs: Any) -> pd.DataFrame:
+        return self._run(self.loader.get_dataframe(*args, **kwargs))
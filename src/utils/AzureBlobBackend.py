@@ -0,0 +1,104 @@
+from typing import Any, Dict, List, Optional
+
+from azure.core import MatchConditions
+from azure.core.exceptions import HttpResponseError, ResourceModifiedError
+from azure.storage.blob import BlobClient, StorageStreamDownloader
+
+from src.utils.BlobClientPool import BlobClientPool
+from src.utils.StorageBackend import (
+    BlobChangedError,
+    BlobHandle,
+    BlobInfo,
+    Download,
+    StorageBackend,
+)
+
+
+def download_info(downloader: StorageStreamDownloader) -> BlobInfo:
+    """Properties of the whole blob from a download, which may be of a range."""
+    properties = downloader.properties
+    if properties.content_range:
+        size = int(properties.content_range.split("/")[-1])
+    else:
+        size = properties.size
+    return BlobInfo(properties.etag, properties.last_modified, size)
+
+
+class AzureBlobHandle(BlobHandle):
+    def __init__(self, client: BlobClient, download_concurrency: int) -> None:
+        super().__init__(client.blob_name)
+        self.client = client
+        self.download_concurrency = download_concurrency
+
+    def download(
+        self, offset: Optional[int] = None, length: Optional[int] = None
+    ) -> Download:
+        downloader = self.client.download_blob(
+            offset=offset, length=length, max_concurrency=self.download_concurrency
+        )
+        return Download(download_info(downloader), downloader.readall)
+
+    def download_if_modified(
+        self, etag: str, offset: Optional[int] = None, length: Optional[int] = None
+    ) -> Optional[Download]:
+        try:
+            downloader = self.client.download_blob(
+                offset=offset,
+                length=length,
+                max_concurrency=self.download_concurrency,
+                etag=etag,
+                match_condition=MatchConditions.IfModified,
+            )
+        except HttpResponseError as error:
+            if error.status_code != 304:
+                raise
+            return None
+        return Download(download_info(downloader), downloader.readall)
+
+    def read_range(self, offset: int, length: int, etag: Optional[str] = None) -> bytes:
+        conditions: Dict[str, Any] = {}
+        if etag is not None:
+            conditions = {
+                "etag": etag,
+                "match_condition": MatchConditions.IfNotModified,
+            }
+        try:
+            return self.client.download_blob(
+                offset=offset,
+                length=length,
+                max_concurrency=self.download_concurrency,
+                **conditions,
+            ).readall()
+        except ResourceModifiedError as error:
+            raise BlobChangedError(str(error)) from error
+
+    def get_properties(self) -> BlobInfo:
+        properties = self.client.get_blob_properties()
+        return BlobInfo(properties.etag, properties.last_modified, properties.size)
+
+
+class AzureBlobBackend(StorageBackend):
+    """Azure Blob Storage, with clients shared through a BlobClientPool."""
+
+    def __init__(self, clients: BlobClientPool, download_concurrency: int = 4) -> None:
+        self.clients = clients
+        self.download_concurrency = download_concurrency
+
+    def get_blob(self, account_url: str, container: str, filename: str) -> BlobHandle:
+        return AzureBlobHandle(
+            self.clients.get_container_client(account_url, container).get_blob_client(
+                filename
+            ),
+            self.download_concurrency,
+        )
+
+    def list(self, account_url: str, container: str, prefix: str = "") -> List[str]:
+        return [
+            blob.name
+            for blob in self.clients.get_container_client(
+                account_url, container
+            ).list_blobs(name_starts_with=prefix or None)
+        ]
+
+    def close(self) -> None:
+        self.clients.close()
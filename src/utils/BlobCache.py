@@ -0,0 +1,88 @@
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+
+from src.utils.CacheStore import CacheStore
+from src.utils.FrameCache import FrameCache
+from src.utils.MemoryCache import MemoryCache
+
+# Keys of a data_files entry that get and get_many use, the others such as "format"
+# and "read_options" only apply to get_dataframe
+BLOB_KEYS = ("account_url", "container", "filename", "ttl", "backend")
+
+
+class BlobCache:
+    """Cache tiers and keys of a DataLoader, apart from fetching the blobs.
+
+    Blobs are stored in a CacheStore on disk behind an in-memory LRU tier, and
+    parsed DataFrames in a FrameCache.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = "cache",
+        cache_codec: str = "lz4",
+        memory_cache_bytes: int = 256 * 1024 * 1024,
+        stale_while_revalidate: bool = False,
+        frame_cache_dir: Optional[str] = None,
+    ) -> None:
+        self.cache = CacheStore(cache_dir, cache_codec)
+        self.frame_cache = FrameCache(frame_cache_dir or Path(cache_dir) / "frames")
+        self.memory_cache = MemoryCache(memory_cache_bytes)
+        self.stale_while_revalidate = stale_while_revalidate
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self.memory_cache.stats()
+
+    def _data_key(
+        self, backend: str, account_url: str, container: str, filename: str
+    ) -> str:
+        data_key = f"{account_url}_{container}_{filename}"
+        return data_key if backend == "azure" else f"{backend}_{data_key}"
+
+    def _blob_options(self, data_file: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in data_file.items() if key in BLOB_KEYS}
+
+    def _options_key(self, data_key: str, options: Dict[str, Any]) -> str:
+        return f"{data_key}_{json.dumps(options, sort_keys=True, default=str)}"
+
+    def _is_fresh(
+        self, metadata: Optional[Dict[str, Any]], ttl: Optional[float]
+    ) -> bool:
+        return bool(
+            metadata is not None
+            and ttl
+            and time.time() - metadata["validated_at"] < ttl
+        )
+
+    def _properties(self, properties: Any) -> Dict[str, Any]:
+        """The blob properties kept in the metadata of a cache entry."""
+        return {
+            "last_modified": properties.last_modified.isoformat(),
+            "etag": properties.etag,
+        }
+
+    def _served(self, frame: pd.DataFrame, etag: str) -> pd.DataFrame:
+        """Record in frame.attrs the ETag of the blob version frame was parsed from."""
+        frame.attrs["etag"] = etag
+        return frame
+
+    def _read_cached(
+        self, data_key: str, metadata: Dict[str, Any]
+    ) -> Optional[memoryview]:
+        data = self.memory_cache.get(data_key, metadata["file"])
+        if data is None:
+            content = self.cache.read(data_key, metadata)
+            if content is not None:
+                data = self.memory_cache.put(data_key, metadata["file"], content)
+        return data
+
+    def _store(
+        self, data_key: str, data: bytes, properties: Any
+    ) -> Tuple[memoryview, Dict[str, Any]]:
+        """Write a downloaded blob to both tiers, returns its view and metadata."""
+        metadata = self.cache.write(data_key, data, self._properties(properties))
+        return self.memory_cache.put(data_key, metadata["file"], data), metadata
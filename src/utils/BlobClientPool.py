@@ -0,0 +1,104 @@
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from azure.core.pipeline.transport import RequestsTransport
+from azure.identity import DefaultAzureCredential
+from azure.storage.blob import BlobServiceClient, ContainerClient
+from requests.adapters import HTTPAdapter
+
+
+class BlobClientPool:
+    """Shares one BlobServiceClient per account URL between threads.
+
+    Every client owns a keep-alive HTTP connection pool, so connections and
+    credential tokens are reused across requests instead of being set up per call.
+    """
+
+    def __init__(
+        self,
+        credential: Optional[DefaultAzureCredential],
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        connection_timeout: int = 20,
+        read_timeout: int = 60,
+        max_single_get_size: int = 32 * 1024 * 1024,
+        max_chunk_get_size: int = 4 * 1024 * 1024,
+    ) -> None:
+        self.credential = credential
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.connection_timeout = connection_timeout
+        self.read_timeout = read_timeout
+        # Blobs larger than max_single_get_size are downloaded as parallel ranges
+        self.max_single_get_size = max_single_get_size
+        self.max_chunk_get_size = max_chunk_get_size
+        self._clients: Dict[str, BlobServiceClient] = {}
+        self._container_clients: Dict[Tuple[str, str], ContainerClient] = {}
+        self._lock = threading.Lock()
+
+    def _build_transport(self) -> RequestsTransport:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return RequestsTransport(
+            session=session,
+            session_owner=True,
+            connection_timeout=self.connection_timeout,
+            read_timeout=self.read_timeout,
+        )
+
+    def get_service_client(self, account_url: str) -> BlobServiceClient:
+        with self._lock:
+            client = self._clients.get(account_url)
+            if client is None:
+                client = BlobServiceClient(
+                    account_url=account_url,
+                    credential=self.credential,
+                    transport=self._build_transport(),
+                    max_single_get_size=self.max_single_get_size,
+                    max_chunk_get_size=self.max_chunk_get_size,
+                )
+                self._clients[account_url] = client
+            return client
+
+    def get_container_client(self, account_url: str, container: str) -> ContainerClient:
+        key = (account_url, container)
+        container_client = self._container_clients.get(key)
+        if container_client is None:
+            container_client = self.get_service_client(
+                account_url
+            ).get_container_client(container)
+            with self._lock:
+                container_client = self._container_clients.setdefault(
+                    key, container_client
+                )
+        return container_client
+
+    def after_fork(self, credential: Optional[DefaultAzureCredential]) -> None:
+        """Drop the clients inherited from the parent process, without closing them.
+
+        Their connections are still used by the parent, new clients with the given
+        credential are created on use.
+        """
+        self.credential = credential
+        self._clients = {}
+        self._container_clients = {}
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._container_clients.clear()
+        for client in clients:
+            client.close()
+
+    def __enter__(self) -> "BlobClientPool":
+        return self
+
+    def __exit__(self, *args: Optional[Any]) -> None:
+        self.close()
@@ -0,0 +1,76 @@
+import io
+from typing import Any, Optional
+
+
+class BufferReader(io.BufferedIOBase):
+    """Read-only, seekable file-like object over a buffer.
+
+    Unlike ``BytesIO`` the underlying buffer is never copied, so many readers can
+    share one cached blob. ``getbuffer()`` exposes the buffer itself for consumers
+    that accept buffers directly, e.g. ``pyarrow.py_buffer``.
+    """
+
+    def __init__(self, buffer: Any) -> None:
+        super().__init__()
+        self._buffer = memoryview(buffer).cast("B")
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def getbuffer(self) -> memoryview:
+        return self._buffer
+
+    def _check_open(self) -> None:
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        self._check_open()
+        start = min(self._position, len(self._buffer))
+        if size is None or size < 0:
+            end = len(self._buffer)
+        else:
+            end = min(start + size, len(self._buffer))
+        self._position = max(self._position, end)
+        return self._buffer[start:end].tobytes()
+
+    def read1(self, size: Optional[int] = -1) -> bytes:
+        return self.read(size)
+
+    def readinto(self, b: Any) -> int:
+        self._check_open()
+        target = memoryview(b).cast("B")
+        start = min(self._position, len(self._buffer))
+        count = min(len(target), len(self._buffer) - start)
+        target[:count] = self._buffer[start : start + count]
+        self._position = start + count
+        return count
+
+    def peek(self, size: int = 0) -> bytes:
+        # Lets IOBase.readline scan ahead without reading byte by byte
+        self._check_open()
+        start = min(self._position, len(self._buffer))
+        return self._buffer[start : start + max(size, io.DEFAULT_BUFFER_SIZE)].tobytes()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        self._check_open()
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = len(self._buffer) + offset
+        else:
+            raise ValueError(f"Invalid whence ({whence})")
+        if position < 0:
+            raise ValueError(f"Negative seek position {position}")
+        self._position = position
+        return self._position
+
+    def tell(self) -> int:
+        self._check_open()
+        return self._position
@@ -0,0 +1,74 @@
+import threading
+import time
+import traceback
+from typing import TYPE_CHECKING, Any, Dict, Optional, Union
+
+from src.utils.DataLoader import DataLoader
+
+if TYPE_CHECKING:
+    from src.utils.AsyncDataLoader import SyncDataLoader
+
+
+class CacheRefresher:
+    """Keeps the cached copies of data files warm from a background thread.
+
+    All files are prefetched when started, and each one is then revalidated every
+    "ttl" seconds of its data_files entry, or default_interval if it has none.
+    Parquet files are skipped, they are read by byte range when they are needed.
+    """
+
+    def __init__(
+        self,
+        data_loader: Union[DataLoader, "SyncDataLoader"],
+        data_files: Dict[str, Dict[str, Any]],
+        default_interval: float = 300,
+    ) -> None:
+        self.data_loader = data_loader
+        self.data_files = {
+            name: data_file
+            for name, data_file in data_files.items()
+            if data_file.get("format", "csv") != "parquet"
+        }
+        self.default_interval = default_interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="CacheRefresher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _interval(self, data_file: Dict[str, Any]) -> float:
+        return data_file.get("ttl") or self.default_interval
+
+    def _run(self) -> None:
+        try:
+            self.data_loader.get_many(self.data_files)
+        except Exception:
+            print("Failed to prefetch data files")
+            traceback.print_exc()
+        next_refresh = {
+            name: time.time() + self._interval(data_file)
+            for name, data_file in self.data_files.items()
+        }
+        while next_refresh and not self._stop.is_set():
+            self._stop.wait(max(0.0, min(next_refresh.values()) - time.time()))
+            for name, due in next_refresh.items():
+                if self._stop.is_set():
+                    break
+                if due <= time.time():
+                    data_file = self.data_files[name]
+                    self.data_loader.refresh(
+                        data_file["account_url"],
+                        data_file["container"],
+                        data_file["filename"],
+                        data_file.get("backend", "azure"),
+                    )
+                    next_refresh[name] = time.time() + self._interval(data_file)
@@ -0,0 +1,198 @@
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import IO, Any, Dict, Optional, Union
+
+import pyarrow as pa
+
+from src.utils.FileLock import FileLock
+
+# "lz4" is the fast codec, it uses the LZ4 frame implementation bundled with pyarrow
+CODECS = ("none", "gzip", "lz4")
+
+
+class CacheStore:
+    """On-disk cache with one entry per key.
+
+    Every entry consists of a content file and a small JSON metadata file. The
+    metadata file points to the content file, so an entry is replaced atomically by
+    writing a new content file and then swapping the metadata file in place.
+    """
+
+    def __init__(self, directory: Union[str, Path] = "cache", codec: str = "lz4"):
+        if codec not in CODECS:
+            raise ValueError(
+                f"Unknown cache codec '{codec}', expected one of {CODECS}."
+            )
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.codec = codec
+
+    def _digest(self, key: str) -> str:
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def _metadata_path(self, key: str) -> Path:
+        return self.directory / f"{self._digest(key)}.json"
+
+    def _open_writer(self, path: Path) -> IO[bytes]:
+        if self.codec == "gzip":
+            return gzip.open(path, "wb", compresslevel=6)  # type: ignore
+        if self.codec == "lz4":
+            return pa.CompressedOutputStream(str(path), "lz4")
+        return open(path, "wb")
+
+    def _atomic_write(self, path: Path, data: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def lock(self, key: str) -> FileLock:
+        """Lock for an entry, used to let only one process refresh it at a time."""
+        return FileLock(self.directory / f"{self._digest(key)}.lock")
+
+    def get_metadata(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._metadata_path(key), "r") as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def read(
+        self, key: str, metadata: Optional[Dict[str, Any]] = None
+    ) -> Optional[Union[bytes, memoryview]]:
+        """Read the content of an entry, or None if the entry does not exist.
+
+        Uncompressed entries are memory-mapped instead of being read into memory.
+        Pass metadata to read the exact version it describes.
+        """
+        if metadata is None:
+            metadata = self.get_metadata(key)
+        if metadata is None:
+            return None
+        path = self.directory / metadata["file"]
+        try:
+            if metadata["size"] == 0:
+                return b""
+            if metadata["codec"] == "none":
+                with open(path, "rb") as file:
+                    return memoryview(
+                        mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                    )
+            if metadata["codec"] == "gzip":
+                with gzip.open(path, "rb") as file:
+                    return file.read()
+            with pa.CompressedInputStream(pa.memory_map(str(path)), "lz4") as stream:
+                return stream.read()
+        except FileNotFoundError:
+            # The entry was replaced between reading the metadata and the content
+            return None
+
+    def open(
+        self, key: str, metadata: Optional[Dict[str, Any]] = None
+    ) -> Optional[IO[bytes]]:
+        """Open the content of an entry as a decompressing stream, or None."""
+        if metadata is None:
+            metadata = self.get_metadata(key)
+        if metadata is None:
+            return None
+        path = self.directory / metadata["file"]
+        try:
+            if metadata["codec"] == "none":
+                return open(path, "rb")
+            if metadata["codec"] == "gzip":
+                return gzip.open(path, "rb")  # type: ignore
+            return pa.CompressedInputStream(pa.OSFile(str(path)), "lz4")
+        except FileNotFoundError:
+            return None
+
+    def open_writer(self, key: str) -> "EntryWriter":
+        """Start writing an entry incrementally, it is only stored on commit."""
+        return EntryWriter(self, key)
+
+    def write(self, key: str, data: bytes, properties: Dict[str, Any]) -> Dict:
+        """Store data for a key, replacing only that entry."""
+        writer = self.open_writer(key)
+        try:
+            writer.write(data)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.commit(properties)
+
+    def _commit(
+        self, key: str, filename: str, size: int, properties: Dict[str, Any]
+    ) -> Dict:
+        old_metadata = self.get_metadata(key)
+        metadata = {
+            "key": key,
+            "file": filename,
+            "codec": self.codec,
+            "size": size,
+            "validated_at": time.time(),
+            "properties": properties,
+        }
+        self._atomic_write(self._metadata_path(key), json.dumps(metadata).encode())
+
+        if old_metadata is not None and old_metadata["file"] not in ("", filename):
+            try:
+                (self.directory / old_metadata["file"]).unlink()
+            except OSError:
+                # Still open by another reader on Windows or already removed
+                pass
+        return metadata
+
+    def write_properties(self, key: str, properties: Dict[str, Any]) -> Dict:
+        """Store an entry with properties but no content.
+
+        For sources that are cached in another form, e.g. only parsed, whose
+        properties are still revalidated like those of the other entries.
+        """
+        return self._commit(key, "", 0, properties)
+
+    def touch(self, key: str) -> None:
+        """Mark an entry as just validated against its source."""
+        metadata = self.get_metadata(key)
+        if metadata is not None:
+            metadata["validated_at"] = time.time()
+            self._atomic_write(self._metadata_path(key), json.dumps(metadata).encode())
+
+
+class EntryWriter:
+    """Writes the content of a cache entry chunk by chunk."""
+
+    def __init__(self, store: CacheStore, key: str) -> None:
+        self.store = store
+        self.key = key
+        self.size = 0
+        self._filename = f"{store._digest(key)}-{uuid.uuid4().hex}.{store.codec}"
+        self._tmp_path = store.directory / f"{self._filename}.tmp"
+        self._file = store._open_writer(self._tmp_path)
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+        self.size += len(data)
+
+    def commit(self, properties: Dict[str, Any]) -> Dict:
+        try:
+            self._file.close()
+            os.replace(self._tmp_path, self.store.directory / self._filename)
+        except BaseException:
+            self.abort()
+            raise
+        return self.store._commit(self.key, self._filename, self.size, properties)
+
+    def abort(self) -> None:
+        self._file.close()
+        if self._tmp_path.exists():
+            self._tmp_path.unlink()
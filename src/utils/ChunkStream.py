@@ -0,0 +1,38 @@
+import io
+from typing import Any, Iterator
+
+
+class ChunkStream(io.RawIOBase):
+    """Read-only file-like object over an iterator of byte chunks.
+
+    Only the current chunk is held in memory. Closing the stream closes the
+    iterator, so generators can clean up after a partial read.
+    """
+
+    def __init__(self, chunks: Iterator[bytes]) -> None:
+        super().__init__()
+        self._chunks = chunks
+        self._chunk = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b: Any) -> int:
+        while not self._chunk:
+            try:
+                self._chunk = memoryview(next(self._chunks))
+            except StopIteration:
+                return 0
+        target = memoryview(b).cast("B")
+        count = min(len(target), len(self._chunk))
+        target[:count] = self._chunk[:count]
+        self._chunk = self._chunk[count:]
+        return count
+
+    def close(self) -> None:
+        if not self.closed:
+            close = getattr(self._chunks, "close", None)
+            if close is not None:
+                close()
+            self._chunk = memoryview(b"")
+        super().close()
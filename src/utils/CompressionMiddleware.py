@@ -0,0 +1,212 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from werkzeug.wsgi import ClosingIterator
+
+from src.utils.MemoryCache import MemoryCache
+from src.utils.SingleFlight import SingleFlight
+
+try:
+    import brotli
+except ImportError:  # Only gzip is offered without brotli
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/xml",
+    "text/javascript",
+    "application/json",
+    "application/javascript",
+    "image/svg+xml",
+)
+
+
+class CompressionMiddleware:
+    """WSGI middleware compressing responses with brotli or gzip per Accept-Encoding.
+
+    Only successful responses of the given content types and at least min_size
+    bytes are compressed. Responses under static_prefixes, at the root or under one
+    of url_bases, are compressed once per content, by one request while concurrent
+    ones wait for it. They are kept in an LRU cache of at most static_cache_bytes.
+    Static directories can be precompressed at startup with precompress, at the
+    highest level as that is not paid for by a request.
+    """
+
+    def __init__(
+        self,
+        app: Callable,
+        min_size: int = 500,
+        content_types: Tuple[str, ...] = COMPRESSIBLE_TYPES,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        static_prefixes: Tuple[str, ...] = (
+            "/assets/",
+            "/_dash-component-suites/",
+            "/vendor/",
+        ),
+        url_bases: Tuple[str, ...] = (),
+        static_cache_bytes: int = 64 * 1024 * 1024,
+    ) -> None:
+        self.app = app
+        self.min_size = min_size
+        self.content_types = content_types
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.static_prefixes = static_prefixes
+        # Longest first, so a url_base nested in another one is stripped whole
+        self.url_bases = sorted(url_bases, key=len, reverse=True)
+        self.encodings = ["br", "gzip"] if brotli is not None else ["gzip"]
+        # "<encoding> <path>" -> compressed body, versioned by the body's digest
+        self._static = MemoryCache(static_cache_bytes)
+        self._single_flight = SingleFlight()
+
+    def _encoding(self, accept_encoding: str) -> Optional[str]:
+        accepted = {}
+        for item in accept_encoding.split(","):
+            name, _, params = item.partition(";")
+            quality = 1.0
+            if params.strip().startswith("q="):
+                try:
+                    quality = float(params.strip()[2:])
+                except ValueError:
+                    pass
+            accepted[name.strip().lower()] = quality
+        for encoding in self.encodings:
+            if accepted.get(encoding, accepted.get("*", 0)) > 0:
+                return encoding
+        return None
+
+    def _compress(self, data: bytes, encoding: str, best: bool = False) -> bytes:
+        if encoding == "br":
+            quality = 11 if best else self.brotli_quality
+            return brotli.compress(data, quality=quality)  # type: ignore
+        return gzip.compress(data, compresslevel=9 if best else self.gzip_level)
+
+    def _compress_static(self, path: str, data: bytes, encoding: str) -> bytes:
+        key = f"{encoding} {path}"
+        digest = hashlib.sha256(data).hexdigest()
+        compressed = self._static.get(key, digest)
+        if compressed is not None:
+            return compressed.tobytes()
+
+        def compress() -> bytes:
+            compressed = self._static.get(key, digest)
+            if compressed is None:
+                compressed = self._static.put(
+                    key, digest, self._compress(data, encoding)
+                )
+            return compressed.tobytes()
+
+        return self._single_flight.do(f"{key} {digest}", compress)
+
+    def _is_static(self, path: str) -> bool:
+        for url_base in self.url_bases:
+            if path.startswith(url_base):
+                # Keep the slash, the prefixes are relative to the url_base
+                path = path[len(url_base) - 1 :]
+                break
+        return path.startswith(self.static_prefixes)
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self._static.stats()
+
+    def precompress(self, url_prefix: str, directory: Union[str, Path]) -> int:
+        """Compress the files of a static directory served under url_prefix now.
+
+        Returns the number of files that were compressed.
+        """
+        count = 0
+        directory = Path(directory)
+        for root, _, filenames in os.walk(directory):
+            for filename in filenames:
+                path = Path(root) / filename
+                content_type, _ = mimetypes.guess_type(str(path))
+                if content_type is None or not content_type.startswith(
+                    self.content_types
+                ):
+                    continue
+                data = path.read_bytes()
+                if len(data) < self.min_size:
+                    continue
+                url = url_prefix + path.relative_to(directory).as_posix()
+                digest = hashlib.sha256(data).hexdigest()
+                for encoding in self.encodings:
+                    self._static.put(
+                        f"{encoding} {url}",
+                        digest,
+                        self._compress(data, encoding, True),
+                    )
+                count += 1
+        return count
+
+    def __call__(self, environ: Dict[str, Any], start_response: Callable) -> Iterable:
+        encoding = self._encoding(environ.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None or environ.get("REQUEST_METHOD") == "HEAD":
+            return self.app(environ, start_response)
+
+        response: List[Any] = []
+        written: List[bytes] = []
+
+        def capture(
+            status: str, headers: List[Tuple[str, str]], exc_info: Any = None
+        ) -> Callable:
+            response[:] = [status, headers, exc_info]
+            return written.append
+
+        app_iter = self.app(environ, capture)
+        chunks = iter(app_iter)
+        if not response:
+            # Some applications only call start_response on the first iteration
+            written.append(next(chunks, b""))
+        status, headers, exc_info = response
+        header_map = {name.lower(): value for name, value in headers}
+        length = header_map.get("content-length")
+        if (
+            not status.startswith("200")
+            or "content-encoding" in header_map
+            or not header_map.get("content-type", "").startswith(self.content_types)
+            or (length is not None and int(length) < self.min_size)
+        ):
+            write = start_response(status, headers, exc_info)
+            for data in written:
+                write(data)
+            return ClosingIterator(chunks, getattr(app_iter, "close", None))
+
+        try:
+            body = b"".join(written) + b"".join(chunks)
+        finally:
+            if hasattr(app_iter, "close"):
+                app_iter.close()  # type: ignore
+        if len(body) < self.min_size:
+            start_response(status, headers, exc_info)
+            return [body]
+
+        path = environ.get("SCRIPT_NAME", "") + environ.get("PATH_INFO", "")
+        if self._is_static(path):
+            compressed = self._compress_static(path, body, encoding)
+        else:
+            compressed = self._compress(body, encoding)
+
+        vary = header_map.get("vary")
+        headers = [
+            # Strong validators describe the uncompressed body, weaken them
+            (
+                (name, f"W/{value}")
+                if name.lower() == "etag" and not value.startswith("W/")
+                else (name, value)
+            )
+            for name, value in headers
+            if name.lower() not in ("content-length", "vary")
+        ] + [
+            ("Content-Encoding", encoding),
+            ("Content-Length", str(len(compressed))),
+            ("Vary", f"{vary}, Accept-Encoding" if vary else "Accept-Encoding"),
+        ]
+        start_response(status, headers, exc_info)
+        return [compressed]
@@ -1,47 +1,499 @@
-import gzip
-import pickle
-from io import BytesIO
-from pathlib import Path
-from typing import Dict
+import contextlib
+import io
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
 
+import pandas as pd
 from azure.identity import DefaultAzureCredential
-from azure.storage.blob import BlobServiceClient
 
+from src.utils.AzureBlobBackend import AzureBlobBackend
+from src.utils.BlobCache import BlobCache
+from src.utils.BlobClientPool import BlobClientPool
+from src.utils.BufferReader import BufferReader
+from src.utils.ChunkStream import ChunkStream
+from src.utils.LocalBackend import LocalBackend
+from src.utils.parquet import Filter, read_parquet
+from src.utils.RangeReader import RangeReader
+from src.utils.SingleFlight import SingleFlight
+from src.utils.StorageBackend import BlobHandle, Download, StorageBackend
 
-class DataLoader:
-    def __init__(self, credential: DefaultAzureCredential):
+
+class DataLoader(BlobCache):
+    def __init__(
+        self,
+        credential: Optional[DefaultAzureCredential],
+        cache_dir: str = "cache",
+        cache_codec: str = "lz4",
+        memory_cache_bytes: int = 256 * 1024 * 1024,
+        transport_settings: Optional[Dict[str, int]] = None,
+        download_concurrency: int = 4,
+        max_parallel_files: int = 8,
+        stale_while_revalidate: bool = False,
+        local_root: str = "data",
+        frame_cache_dir: Optional[str] = None,
+        backends: Optional[Dict[str, StorageBackend]] = None,
+    ):
+        super().__init__(
+            cache_dir,
+            cache_codec,
+            memory_cache_bytes,
+            stale_while_revalidate,
+            frame_cache_dir,
+        )
         self.credential = credential
-        self.cache: Dict = {}
-        if Path("cache.gz").is_file():
-            with gzip.open("cache.gz", "rb") as file:
-                self.cache = pickle.load(file)  # type: ignore
+        self.clients = BlobClientPool(credential, **(transport_settings or {}))
+        # Selected per data_files entry with "backend", defaults to "azure". The
+        # given backends replace these by name.
+        self.backends: Dict[str, StorageBackend] = {
+            "azure": AzureBlobBackend(self.clients, download_concurrency),
+            "local": LocalBackend(local_root),
+            **(backends or {}),
+        }
+        self.single_flight = SingleFlight()
+        self.download_concurrency = download_concurrency
+        self.max_parallel_files = max_parallel_files
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
 
-    def get(
-        self, account_url: str, container: str, filename: str, use_cache: bool = True
-    ) -> BytesIO:
-        client = BlobServiceClient(
-            account_url=account_url,
-            credential=self.credential,
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_parallel_files,
+                    thread_name_prefix="DataLoader",
+                )
+            return self._executor
+
+    def after_fork(self, credential: Optional[DefaultAzureCredential]) -> None:
+        """Give a forked child process its own credential, clients and threads."""
+        self.credential = credential
+        self.clients.after_fork(credential)
+        self.single_flight = SingleFlight()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def close(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+        for backend in self.backends.values():
+            backend.close()
+
+    def __enter__(self) -> "DataLoader":
+        return self
+
+    def __exit__(self, *args: Optional[Any]) -> None:
+        self.close()
+
+    def _download(
+        self,
+        blob: BlobHandle,
+        data_key: str,
+        metadata: Optional[Dict[str, Any]],
+        **kwargs: Any,
+    ) -> Optional[Download]:
+        """Start a download, unless the cached entry is still current.
+
+        The cached copy is revalidated with a conditional download on its ETag, so
+        both hits and misses cost a single request. Returns None when the cached
+        copy should be served.
+        """
+        if metadata is None:
+            return blob.download(**kwargs)
+        download = blob.download_if_modified(metadata["properties"]["etag"], **kwargs)
+        if download is None:
+            self.cache.touch(data_key)
+        return download
+
+    @contextlib.contextmanager
+    def _revalidated(
+        self,
+        blob: BlobHandle,
+        data_key: str,
+        ttl: Optional[float],
+        allow_stale: bool = True,
+        **download_options: Any,
+    ) -> Iterator[Tuple[Optional[Dict[str, Any]], Optional[Download]]]:
+        """Yield the cached metadata, and a download if the cached copy is stale.
+
+        Within ttl seconds of the last validation the cached copy is current
+        without any request. With stale_while_revalidate, a stale copy is served
+        as is while it is refreshed in the background. Otherwise the entry's file
+        lock is held until the block exits, so only one process revalidates and
+        downloads at a time and the others serve what it stored. The download is
+        started with download_options, e.g. a range.
+        """
+        metadata = self.cache.get_metadata(data_key)
+        if self._is_fresh(metadata, ttl):
+            yield metadata, None
+            return
+        if metadata is not None and allow_stale and self.stale_while_revalidate:
+            self._get_executor().submit(self._refresh, blob, data_key)
+            yield metadata, None
+            return
+        started = time.time()
+        with self.cache.lock(data_key):
+            metadata = self.cache.get_metadata(data_key)
+            if metadata is not None and metadata["validated_at"] >= started:
+                # Another process revalidated the entry while we waited
+                yield metadata, None
+            else:
+                yield metadata, self._download(
+                    blob, data_key, metadata, **download_options
+                )
+
+    def _refresh(self, blob: BlobHandle, data_key: str) -> None:
+        def refresh() -> None:
+            with self._revalidated(blob, data_key, None, False) as (
+                metadata,
+                downloader,
+            ):
+                if downloader is not None:
+                    self._read(blob, data_key, metadata, downloader)
+
+        try:
+            self.single_flight.do(f"refresh_{data_key}", refresh)
+        except Exception:
+            print(f"Failed to refresh file {blob.name}")
+            traceback.print_exc()
+
+    def refresh(
+        self, account_url: str, container: str, filename: str, backend: str = "azure"
+    ) -> None:
+        """Revalidate the cached copy of a blob now, downloading it if it changed."""
+        self._refresh(
+            self._get_blob(backend, account_url, container, filename),
+            self._data_key(backend, account_url, container, filename),
         )
-        blobClient = client.get_container_client(container).get_blob_client(filename)
+
+    def version(
+        self,
+        account_url: str,
+        container: str,
+        filename: str,
+        ttl: Optional[float] = None,
+        backend: str = "azure",
+    ) -> str:
+        """ETag of a blob, taken from the cached copy while it is within ttl.
+
+        Once ttl has passed, the ETag is requested and the cached copy marked as
+        validated if it still matches. With stale_while_revalidate, the ETag of
+        the cached copy is returned while it is refreshed in the background.
+        """
+        blob = self._get_blob(backend, account_url, container, filename)
+        data_key = self._data_key(backend, account_url, container, filename)
+        metadata = self.cache.get_metadata(data_key)
+        if self._is_fresh(metadata, ttl):
+            return metadata["properties"]["etag"]  # type: ignore
+        if metadata is not None and self.stale_while_revalidate:
+            self._get_executor().submit(self._refresh, blob, data_key)
+            return metadata["properties"]["etag"]
+        etag = blob.get_properties().etag
+        if metadata is not None and metadata["properties"]["etag"] == etag:
+            self.cache.touch(data_key)
+        return etag
+
+    def _get_blob(
+        self, backend: str, account_url: str, container: str, filename: str
+    ) -> BlobHandle:
+        return self.backends[backend].get_blob(account_url, container, filename)
+
+    def list(
+        self, account_url: str, container: str, prefix: str = "", backend: str = "azure"
+    ) -> List[str]:
+        return self.backends[backend].list(account_url, container, prefix)
+
+    def _read(
+        self,
+        blob: BlobHandle,
+        data_key: str,
+        metadata: Optional[Dict[str, Any]],
+        downloader: Optional[Download],
+    ) -> Tuple[memoryview, Dict[str, Any]]:
+        """Read the cached copy, or finish the download and cache it."""
+        filename = blob.name
+        if downloader is None and metadata is not None:
+            cached = self._read_cached(data_key, metadata)
+            if cached is not None:
+                print(f"Loading file {filename} from cache")
+                return cached, metadata
+        if downloader is None:
+            downloader = blob.download()
+        print(f"Loading file {filename} from datastore and caching")
+        return self._store(data_key, downloader.readall(), downloader.properties)
+
+    def get(
+        self,
+        account_url: str,
+        container: str,
+        filename: str,
+        use_cache: bool = True,
+        ttl: Optional[float] = None,
+        backend: str = "azure",
+    ) -> BufferReader:
+        """Load a blob, serving it from the cache when it has not changed."""
+        blob = self._get_blob(backend, account_url, container, filename)
         if use_cache:
-            data_key = f"{account_url}_{container}_{filename}"
-            properties = blobClient.get_blob_properties()
-            if data_key in self.cache:
-                cached_last_modified = self.cache[data_key]["properties"][
-                    "last_modified"
-                ]
-                last_modified = properties["last_modified"]
-                if last_modified <= cached_last_modified:
-                    print(f"Loading file {filename} from cache")
-                    return BytesIO(self.cache[data_key]["data"])
-            print(f"Loading file {filename} from datastore and caching")
-            self.cache[data_key] = {
-                "data": blobClient.download_blob().readall(),
-                "properties": properties,
-            }
-            with gzip.open("cache.gz", "wb") as file:
-                pickle.dump(self.cache, file)  # type: ignore
-            return BytesIO(self.cache[data_key]["data"])
+            data_key = self._data_key(backend, account_url, container, filename)
+
+            def fetch() -> Tuple[memoryview, Dict[str, Any]]:
+                with self._revalidated(blob, data_key, ttl) as (
+                    metadata,
+                    downloader,
+                ):
+                    return self._read(blob, data_key, metadata, downloader)
+
+            data, _ = self.single_flight.do(data_key, fetch)
+            return BufferReader(data)
         print(f"Loading file {filename} from datastore")
-        return BytesIO(blobClient.download_blob().readall())
+        return BufferReader(blob.download().readall())
+
+    def get_dataframe(
+        self,
+        account_url: str,
+        container: str,
+        filename: str,
+        use_cache: bool = True,
+        ttl: Optional[float] = None,
+        read_options: Optional[Dict[str, Any]] = None,
+        backend: str = "azure",
+        format: str = "csv",
+        columns: Optional[List[str]] = None,
+        filters: Optional[List[Filter]] = None,
+    ) -> pd.DataFrame:
+        """Load a CSV or Parquet blob as a DataFrame.
+
+        CSV blobs are parsed with pd.read_csv(**read_options). Parquet blobs are
+        read with byte-range requests, only the given columns and the row groups
+        whose statistics may match filters are downloaded.
+
+        The DataFrame is cached per blob version and options, so a warm load reads
+        a memory-mapped Arrow file instead of parsing the blob again. With
+        use_cache, its numeric columns are read-only views of that file, so copy
+        the DataFrame before modifying it in place, e.g. with df.loc[...] = ...
+
+        df.attrs["etag"] is the ETag of the blob version the DataFrame holds, which
+        can be older than version() while a stale entry is revalidated. It is not
+        set for a CSV loaded without use_cache.
+        """
+        if format == "parquet":
+            return self._get_parquet(
+                account_url,
+                container,
+                filename,
+                use_cache,
+                ttl,
+                backend,
+                columns,
+                filters,
+            )
+        if format != "csv":
+            raise ValueError(f"Unknown data format '{format}'")
+        read_options = read_options or {}
+        if not use_cache:
+            return pd.read_csv(
+                self.get(
+                    account_url, container, filename, use_cache=False, backend=backend
+                ),
+                **read_options,
+            )
+        blob = self._get_blob(backend, account_url, container, filename)
+        data_key = self._data_key(backend, account_url, container, filename)
+
+        def load() -> pd.DataFrame:
+            with self._revalidated(blob, data_key, ttl) as (
+                metadata,
+                downloader,
+            ):
+                if downloader is None and metadata is not None:
+                    frame = self.frame_cache.get(
+                        data_key, metadata["properties"]["etag"], read_options
+                    )
+                    if frame is not None:
+                        print(f"Loading dataframe {filename} from cache")
+                        return self._served(frame, metadata["properties"]["etag"])
+                data, metadata = self._read(blob, data_key, metadata, downloader)
+            etag = metadata["properties"]["etag"]
+            frame = self.frame_cache.get_or_put(
+                data_key,
+                etag,
+                read_options,
+                lambda: pd.read_csv(BufferReader(data), **read_options),  # type: ignore
+            )
+            return self._served(frame, etag)
+
+        return self.single_flight.do(self._options_key(data_key, read_options), load)
+
+    def _get_parquet(
+        self,
+        account_url: str,
+        container: str,
+        filename: str,
+        use_cache: bool,
+        ttl: Optional[float],
+        backend: str,
+        columns: Optional[List[str]],
+        filters: Optional[List[Filter]],
+    ) -> pd.DataFrame:
+        blob = self._get_blob(backend, account_url, container, filename)
+        data_key = self._data_key(backend, account_url, container, filename)
+        options = {"format": "parquet", "columns": columns, "filters": filters}
+
+        def load() -> pd.DataFrame:
+            if use_cache:
+                properties = self._parquet_properties(blob, data_key, ttl)
+                etag, size = properties["etag"], properties["size"]
+                frame = self.frame_cache.get(data_key, etag, options)
+                if frame is not None:
+                    print(f"Loading dataframe {filename} from cache")
+                    return self._served(frame, etag)
+            else:
+                info = blob.get_properties()
+                etag, size = info.etag, info.size
+
+            def parse() -> pd.DataFrame:
+                reader = RangeReader(blob.read_range, size, etag)
+                frame = read_parquet(reader, columns, filters)
+                print(
+                    f"Loading file {filename} from datastore, "
+                    f"read {reader.bytes_read} of {size} bytes"
+                )
+                return frame
+
+            if not use_cache:
+                return self._served(parse(), etag)
+            frame = self.frame_cache.get_or_put(data_key, etag, options, parse)
+            return self._served(frame, etag)
+
+        if not use_cache:
+            return load()
+        return self.single_flight.do(self._options_key(data_key, options), load)
+
+    def _parquet_properties(
+        self, blob: BlobHandle, data_key: str, ttl: Optional[float]
+    ) -> Dict[str, Any]:
+        """Properties of a Parquet blob, only requested again once ttl has passed.
+
+        Its content is only cached as DataFrames, so the properties are kept in a
+        cache entry of their own.
+        """
+        properties_key = f"parquet_{data_key}"
+        metadata = self.cache.get_metadata(properties_key)
+        if self._is_fresh(metadata, ttl):
+            return metadata["properties"]  # type: ignore
+        info = blob.get_properties()
+        properties = {**self._properties(info), "size": info.size}
+        return self.cache.write_properties(properties_key, properties)["properties"]
+
+    def open(
+        self,
+        account_url: str,
+        container: str,
+        filename: str,
+        use_cache: bool = True,
+        ttl: Optional[float] = None,
+        chunk_size: Optional[int] = None,
+        backend: str = "azure",
+    ) -> IO[bytes]:
+        """Open a blob as a stream without loading the whole blob into memory.
+
+        The blob is downloaded in ranges of chunk_size bytes while it is read, and
+        written to the cache as it streams by. The cache entry is only stored once
+        the stream has been read to the end.
+        """
+        chunk_size = chunk_size or self.clients.max_chunk_get_size
+        blob = self._get_blob(backend, account_url, container, filename)
+        if use_cache:
+            data_key = self._data_key(backend, account_url, container, filename)
+            with self._revalidated(
+                blob, data_key, ttl, offset=0, length=chunk_size
+            ) as (metadata, downloader):
+                if downloader is None and metadata is not None:
+                    stream = self.cache.open(data_key, metadata)
+                    if stream is not None:
+                        print(f"Streaming file {filename} from cache")
+                        return stream
+            if downloader is None:
+                downloader = blob.download(offset=0, length=chunk_size)
+            print(f"Streaming file {filename} from datastore and caching")
+            chunks = self._iter_blob(blob, downloader, chunk_size, data_key)
+        else:
+            print(f"Streaming file {filename} from datastore")
+            downloader = blob.download(offset=0, length=chunk_size)
+            chunks = self._iter_blob(blob, downloader, chunk_size)
+        return io.BufferedReader(ChunkStream(chunks))
+
+    def iter_chunks(
+        self,
+        account_url: str,
+        container: str,
+        filename: str,
+        use_cache: bool = True,
+        ttl: Optional[float] = None,
+        chunk_size: Optional[int] = None,
+        backend: str = "azure",
+    ) -> Iterator[bytes]:
+        """Iterate over a blob in chunks of at most chunk_size bytes."""
+        chunk_size = chunk_size or self.clients.max_chunk_get_size
+        with self.open(
+            account_url, container, filename, use_cache, ttl, chunk_size, backend
+        ) as stream:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def _iter_blob(
+        self,
+        blob: BlobHandle,
+        downloader: Download,
+        chunk_size: int,
+        data_key: Optional[str] = None,
+    ) -> Iterator[bytes]:
+        properties = downloader.properties
+        size = properties.size
+        writer = self.cache.open_writer(data_key) if data_key else None
+        committed = False
+        try:
+            chunk = downloader.readall()
+            offset = len(chunk)
+            while True:
+                if writer is not None:
+                    writer.write(chunk)
+                yield chunk
+                if offset >= size:
+                    break
+                # Fail rather than mix two versions if the blob changes mid-stream
+                chunk = blob.read_range(
+                    offset, min(chunk_size, size - offset), properties.etag
+                )
+                offset += len(chunk)
+            if writer is not None:
+                # Under the entry lock, like the commits of the other readers
+                with self.cache.lock(writer.key):
+                    writer.commit(self._properties(properties))
+                committed = True
+        finally:
+            if writer is not None and not committed:
+                writer.abort()
+
+    def get_many(
+        self, data_files: Dict[str, Dict[str, Any]], use_cache: bool = True
+    ) -> Dict[str, BufferReader]:
+        """Load several data_files entries concurrently, keyed like data_files.
+
+        Keys of the entries that only apply to get_dataframe are ignored.
+        """
+        executor = self._get_executor()
+        futures = {
+            name: executor.submit(
+                self.get, use_cache=use_cache, **self._blob_options(data_file)
+            )
+            for name, data_file in data_files.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,71 @@
+import sys
+from pathlib import Path
+from typing import IO, Any, Optional, Union
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+
+class FileLock:
+    """Exclusive advisory lock on a file, shared between processes."""
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self._file: Optional[IO[bytes]] = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """Take the lock, without blocking returns False if it is held elsewhere."""
+        file = open(self.path, "a+b")
+        try:
+            if sys.platform == "win32":
+                file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(
+                            file.fileno(),
+                            msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK,
+                            1,
+                        )
+                        break
+                    except OSError:
+                        if not blocking:
+                            file.close()
+                            return False
+                        # LK_LOCK gives up after 10 attempts, keep waiting
+                        continue
+            else:
+                try:
+                    fcntl.flock(
+                        file.fileno(),
+                        fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB,
+                    )
+                except BlockingIOError:
+                    file.close()
+                    return False
+        except BaseException:
+            file.close()
+            raise
+        self._file = file
+        return True
+
+    def release(self) -> None:
+        file, self._file = self._file, None
+        if file is None:
+            return
+        try:
+            if sys.platform == "win32":
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+        finally:
+            file.close()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *args: Optional[Any]) -> None:
+        self.release()
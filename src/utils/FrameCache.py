@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import tempfile
+import traceback
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+from src.utils.FileLock import FileLock
+
+
+class FrameCache:
+    """Cache of parsed DataFrames stored as uncompressed Arrow IPC (Feather) files.
+
+    Entries are keyed by the source, its version and the parse options, and are
+    read back through a memory map instead of being parsed again. Put the
+    directory on a shared memory file system such as /dev/shm to let all worker
+    processes share one copy of each DataFrame: numeric columns are returned as
+    read-only views of the mapped file, so they must not be modified in place.
+    """
+
+    def __init__(self, directory: Union[str, Path]) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _prefix(self, source_key: str, options: Dict[str, Any]) -> str:
+        options_key = json.dumps(options, sort_keys=True, default=str)
+        return hashlib.sha256(f"{source_key}_{options_key}".encode()).hexdigest()
+
+    def _path(self, source_key: str, version: str, options: Dict[str, Any]) -> Path:
+        version_digest = hashlib.sha256(version.encode()).hexdigest()[:16]
+        return self.directory / (
+            f"{self._prefix(source_key, options)}-{version_digest}.arrow"
+        )
+
+    def get(
+        self, source_key: str, version: str, options: Dict[str, Any]
+    ) -> Optional[pd.DataFrame]:
+        path = self._path(source_key, version, options)
+        try:
+            with pa.memory_map(str(path)) as source:
+                table = pa.ipc.open_file(source).read_all()
+        except FileNotFoundError:
+            return None
+        # One block per column lets pandas wrap the mapped buffers without copying
+        return table.to_pandas(split_blocks=True)
+
+    def get_or_put(
+        self,
+        source_key: str,
+        version: str,
+        options: Dict[str, Any],
+        load: Callable[[], pd.DataFrame],
+    ) -> pd.DataFrame:
+        """Get an entry, or create it with load() if no other process has yet.
+
+        The created entry is returned memory-mapped as well, so the process that
+        wrote it does not keep a private copy. If it cannot be stored, the frame
+        returned by load() is returned as is.
+        """
+        frame = self.get(source_key, version, options)
+        if frame is not None:
+            return frame
+        with FileLock(self.directory / f"{self._prefix(source_key, options)}.lock"):
+            frame = self.get(source_key, version, options)
+            if frame is None:
+                frame = load()
+                try:
+                    self.put(source_key, version, options, frame)
+                except OSError:
+                    # E.g. the directory is full, serve the frame without caching it
+                    print(f"Failed to store a parsed DataFrame in {self.directory}")
+                    traceback.print_exc()
+                    return frame
+                frame = self.get(source_key, version, options)
+        if frame is None:
+            raise FileNotFoundError(self._path(source_key, version, options))
+        return frame
+
+    def put(
+        self,
+        source_key: str,
+        version: str,
+        options: Dict[str, Any],
+        frame: pd.DataFrame,
+    ) -> None:
+        path = self._path(source_key, version, options)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            feather.write_feather(frame, tmp_path, compression="uncompressed")
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        # Older versions of the same source and options are never read again, and
+        # processes that still map them keep their pages until they let go
+        for old_path in self.directory.glob(
+            f"{self._prefix(source_key, options)}-*.arrow"
+        ):
+            if old_path != path:
+                try:
+                    old_path.unlink()
+                except OSError:
+                    pass
@@ -0,0 +1,127 @@
+import json
+import os
+import tempfile
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+from src.utils.FileLock import FileLock
+
+
+class JobQueue:
+    """Runs slow jobs on a bounded pool and keeps their status in a directory.
+
+    At most max_workers jobs run at the same time across all processes sharing the
+    directory, further jobs wait in the queue. The status of every job is stored as
+    a JSON file, so it can be polled from any of those processes.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path] = "cache/jobs",
+        max_workers: int = 2,
+        max_age: float = 3600,
+        encode: Callable[[Any], str] = json.dumps,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers
+        self.max_age = max_age
+        self.encode = encode
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="JobQueue")
+
+    def _path(self, job_id: str) -> Path:
+        return self.directory / f"{job_id}.json"
+
+    def _write(self, job_id: str, status: Dict[str, Any]) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as file:
+                file.write(json.dumps(status))
+            os.replace(tmp_path, self._path(job_id))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _acquire_slot(self) -> FileLock:
+        """Wait for one of the max_workers slots shared by all processes."""
+        while True:
+            for slot in range(self.max_workers):
+                lock = FileLock(self.directory / f"slot-{slot}.lock")
+                if lock.acquire(blocking=False):
+                    return lock
+            time.sleep(0.05)
+
+    def _run(self, job_id: str, func: Callable[..., Any], *args: Any) -> None:
+        slot = self._acquire_slot()
+        try:
+            self._write(job_id, {"status": "running", "started_at": time.time()})
+            try:
+                result = self.encode(func(*args))
+            except Exception:
+                traceback.print_exc()
+                self._write(
+                    job_id, {"status": "error", "error": traceback.format_exc()}
+                )
+            else:
+                # The result is stored encoded, it is decoded by the one that polls it
+                self._write(job_id, {"status": "done", "result": result})
+        finally:
+            slot.release()
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> str:
+        """Queue func(*args) and return the id to poll its status with."""
+        self._remove_old()
+        job_id = uuid.uuid4().hex
+        self._write(job_id, {"status": "queued", "queued_at": time.time()})
+        self._executor.submit(self._run, job_id, func, *args)
+        return job_id
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status of a job, "result" holds the encoded result once it is "done"."""
+        try:
+            with open(self._path(job_id), "r") as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Wait up to timeout seconds for a job to finish, returns its last status."""
+        deadline = time.time() + timeout
+        status = self.status(job_id)
+        while (
+            status is not None
+            and status["status"] in ("queued", "running")
+            and time.time() < deadline
+        ):
+            time.sleep(0.01)
+            status = self.status(job_id)
+        return status
+
+    def remove(self, job_id: str) -> None:
+        try:
+            self._path(job_id).unlink()
+        except OSError:
+            pass
+
+    def _remove_old(self) -> None:
+        # Results that were never polled, e.g. because the browser was closed
+        expired = time.time() - self.max_age
+        for path in self.directory.glob("*.json"):
+            try:
+                if path.stat().st_mtime < expired:
+                    path.unlink()
+            except OSError:
+                pass
+
+    def after_fork(self) -> None:
+        """Start a new pool in a forked child process, its threads are not copied."""
+        self._executor = ThreadPoolExecutor(
+            self.max_workers, thread_name_prefix="JobQueue"
+        )
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
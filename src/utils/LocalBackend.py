@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Union
+
+from src.utils.StorageBackend import (
+    BlobChangedError,
+    BlobHandle,
+    BlobInfo,
+    Download,
+    StorageBackend,
+)
+
+
+class LocalBlobHandle(BlobHandle):
+    def __init__(self, path: Path, name: str) -> None:
+        super().__init__(name)
+        self.path = path
+
+    def get_properties(self) -> BlobInfo:
+        stat = self.path.stat()
+        return BlobInfo(
+            f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"',
+            datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+            stat.st_size,
+        )
+
+    def _read(self, offset: Optional[int], length: Optional[int]) -> bytes:
+        with open(self.path, "rb") as file:
+            file.seek(offset or 0)
+            return file.read(-1 if length is None else length)
+
+    def download(
+        self, offset: Optional[int] = None, length: Optional[int] = None
+    ) -> Download:
+        return Download(self.get_properties(), lambda: self._read(offset, length))
+
+    def download_if_modified(
+        self, etag: str, offset: Optional[int] = None, length: Optional[int] = None
+    ) -> Optional[Download]:
+        download = self.download(offset, length)
+        if download.properties.etag == etag:
+            return None
+        return download
+
+    def read_range(self, offset: int, length: int, etag: Optional[str] = None) -> bytes:
+        if etag is not None and etag != self.get_properties().etag:
+            raise BlobChangedError(f"{self.path} was modified")
+        return self._read(offset, length)
+
+
+class LocalBackend(StorageBackend):
+    """Reads blobs from a local directory with one subdirectory per container.
+
+    Lets the dashboards and the loading path run, and be measured, without a
+    storage account. The account URL is ignored.
+    """
+
+    def __init__(self, root: Union[str, Path] = "data") -> None:
+        self.root = Path(root)
+
+    def get_blob(self, account_url: str, container: str, filename: str) -> BlobHandle:
+        return LocalBlobHandle(self.root / container / filename, filename)
+
+    def list(self, account_url: str, container: str, prefix: str = "") -> List[str]:
+        directory = self.root / container
+        return sorted(
+            path.relative_to(directory).as_posix()
+            for path in directory.rglob("*")
+            if path.is_file()
+            and path.relative_to(directory).as_posix().startswith(prefix)
+        )
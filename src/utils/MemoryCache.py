@@ -0,0 +1,61 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class MemoryCache:
+    """In-process LRU cache bounded by the total size of the cached buffers.
+
+    Entries are stored with a version, a lookup with another version is a miss.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[str, memoryview]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _remove(self, key: str) -> None:
+        _, data = self._entries.pop(key)
+        self._size -= data.nbytes
+
+    def get(self, key: str, version: str) -> Optional[memoryview]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, version: str, data: Any) -> memoryview:
+        view = memoryview(data)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if view.nbytes > self.max_bytes:
+                return view
+            while self._size + view.nbytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+            self._entries[key] = (version, view)
+            self._size += view.nbytes
+        return view
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,59 @@
+import io
+from typing import Any, Callable, Optional
+
+
+class RangeReader(io.RawIOBase):
+    """Seekable file-like object that fetches only the byte ranges that are read.
+
+    Every read calls read_range(offset, length, etag), e.g. BlobHandle.read_range,
+    which makes a ranged request conditioned on the ETag, so readers such as
+    pyarrow.parquet.ParquetFile only download the footer and the column chunks
+    they need, and fail instead of mixing two versions of the blob.
+    """
+
+    def __init__(
+        self,
+        read_range: Callable[[int, int, Optional[str]], bytes],
+        size: int,
+        etag: Optional[str],
+    ) -> None:
+        super().__init__()
+        self.read_range = read_range
+        self.size = size
+        self.etag = etag
+        self.bytes_read = 0
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence ({whence})")
+        if position < 0:
+            raise ValueError(f"Negative seek position {position}")
+        self._position = position
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def readinto(self, b: Any) -> int:
+        target = memoryview(b).cast("B")
+        length = min(len(target), self.size - self._position)
+        if length <= 0:
+            return 0
+        data = self.read_range(self._position, length, self.etag)
+        target[: len(data)] = data
+        self._position += len(data)
+        self.bytes_read += len(data)
+        return len(data)
@@ -0,0 +1,65 @@
+import abc
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional
+
+
+class BlobChangedError(Exception):
+    """The blob no longer has the ETag a conditional read required."""
+
+
+class BlobInfo(NamedTuple):
+    etag: str
+    last_modified: datetime
+    size: int
+
+
+class Download:
+    """A started download, the content is only transferred by readall()."""
+
+    def __init__(self, properties: BlobInfo, read: Callable[[], bytes]) -> None:
+        self.properties = properties
+        self._read = read
+
+    def readall(self) -> bytes:
+        return self._read()
+
+
+class BlobHandle(metaclass=abc.ABCMeta):
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    @abc.abstractmethod
+    def download(
+        self, offset: Optional[int] = None, length: Optional[int] = None
+    ) -> Download:
+        """Start downloading the blob, or a byte range of it.
+
+        The properties of the download always describe the whole blob.
+        """
+
+    @abc.abstractmethod
+    def download_if_modified(
+        self, etag: str, offset: Optional[int] = None, length: Optional[int] = None
+    ) -> Optional[Download]:
+        """Like download, but returns None if the blob still has the given ETag."""
+
+    @abc.abstractmethod
+    def read_range(self, offset: int, length: int, etag: Optional[str] = None) -> bytes:
+        """Read a byte range, raising BlobChangedError if the ETag no longer matches."""
+
+    @abc.abstractmethod
+    def get_properties(self) -> BlobInfo:
+        pass
+
+
+class StorageBackend(metaclass=abc.ABCMeta):
+    @abc.abstractmethod
+    def get_blob(self, account_url: str, container: str, filename: str) -> BlobHandle:
+        pass
+
+    @abc.abstractmethod
+    def list(self, account_url: str, container: str, prefix: str = "") -> List[str]:
+        pass
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,72 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import List, Tuple, Union
+
+import dash_bootstrap_components as dbc
+from flask import Flask, Response, abort, send_from_directory
+
+# (CDN URL, path in the vendor directory) of the stylesheets used by the Dash apps.
+# The ".vendor.css" suffix keeps Dash from including them as app assets.
+VENDOR_STYLESHEETS: List[Tuple[str, str]] = [
+    (
+        "https://use.fontawesome.com/releases/v5.8.1/css/all.css",
+        "fontawesome/css/all.vendor.css",
+    ),
+    (dbc.themes.BOOTSTRAP, "bootstrap/css/bootstrap.vendor.css"),
+    (
+        "https://eds-static.equinor.com/font/equinor-font.css",
+        "equinor/equinor-font.vendor.css",
+    ),
+]
+
+
+class VendorAssets:
+    """Serves the vendored stylesheets and fonts under a content fingerprint.
+
+    The fingerprint is a hash of every file in the directory, so the URLs change
+    whenever a file does and the responses can be cached forever. Fetch the files
+    with `python -m scripts.vendor_assets`.
+    """
+
+    def __init__(
+        self, directory: Union[str, Path] = "assets/vendor", url_prefix: str = "/vendor"
+    ) -> None:
+        self.directory = Path(directory)
+        self.url_prefix = url_prefix
+        self.fingerprint = self._fingerprint()
+
+    def _fingerprint(self) -> str:
+        digest = hashlib.sha256()
+        for root, _, filenames in sorted(os.walk(self.directory)):
+            for filename in sorted(filenames):
+                path = Path(root) / filename
+                digest.update(path.relative_to(self.directory).as_posix().encode())
+                digest.update(path.read_bytes())
+        return digest.hexdigest()[:12]
+
+    def url(self, path: str) -> str:
+        return f"{self.url_prefix}/{self.fingerprint}/{path}"
+
+    def stylesheets(self) -> List[str]:
+        """Local URLs of the vendored stylesheets, or the CDN URL of missing ones."""
+        urls = []
+        for cdn_url, path in VENDOR_STYLESHEETS:
+            if (self.directory / path).is_file():
+                urls.append(self.url(path))
+            else:
+                print(f"Vendored stylesheet {path} is missing, using {cdn_url}")
+                urls.append(cdn_url)
+        return urls
+
+    def init_app(self, server: Flask) -> None:
+        def vendor(fingerprint: str, filename: str) -> Response:
+            if fingerprint != self.fingerprint:
+                abort(404)
+            response = send_from_directory(self.directory.resolve(), filename)
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+            return response
+
+        server.add_url_rule(
+            f"{self.url_prefix}/<fingerprint>/<path:filename>", "vendor", vendor
+        )
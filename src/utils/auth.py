@@ -1,5 +1,7 @@
 import functools
 import os
+import threading
+import time
 from typing import Any, Callable, Dict, List, Optional
 
 import msal
@@ -10,15 +12,33 @@ from src.models.AppSettings import AppSettings
 
 
 class Auth:
-    def __init__(self, app_settings: AppSettings, client: SecretClient):
+    """Signs users in with MSAL, keeping their token cache in the session.
+
+    The MSAL apps are reused, one per authority in each thread, with the token cache
+    of the current session loaded into them. A successful token check is trusted
+    for verdict_ttl seconds, or until the token expires, by login_required.
+    """
+
+    def __init__(
+        self, app_settings: AppSettings, client: SecretClient, verdict_ttl: float = 60
+    ):
         self.app_settings = app_settings
+        self.verdict_ttl = verdict_ttl
 
         self.client_credential = client.get_secret(self.app_settings.secret_name).value
+        # Responses of the authority metadata discovery, shared by all MSAL apps
+        self._http_cache: Dict[Any, Any] = {}
+        self._local = threading.local()
+
+    def _thread_cache(self) -> msal.SerializableTokenCache:
+        if not hasattr(self._local, "cache"):
+            self._local.cache = msal.SerializableTokenCache()
+            self._local.apps = {}
+        return self._local.cache
 
     def _load_cache(self) -> msal.SerializableTokenCache:
-        cache = msal.SerializableTokenCache()
-        if session.get("token_cache"):
-            cache.deserialize(session["token_cache"])
+        cache = self._thread_cache()
+        cache.deserialize(session.get("token_cache"))
         return cache
 
     def _save_cache(self, cache: Any) -> None:
@@ -28,12 +48,30 @@ class Auth:
     def _build_msal_app(
         self, cache: Any = None, authority: Any = None
     ) -> msal.ConfidentialClientApplication:
-        return msal.ConfidentialClientApplication(
-            self.app_settings.client_id,
-            authority=authority or self.app_settings.authority,
-            client_credential=self.client_credential,
-            token_cache=cache,
-        )
+        thread_cache = self._thread_cache()
+        if cache is None:
+            # Nothing of another session may be left in the cache of the thread
+            thread_cache.deserialize(None)
+        elif cache is not thread_cache:
+            return msal.ConfidentialClientApplication(
+                self.app_settings.client_id,
+                authority=authority or self.app_settings.authority,
+                client_credential=self.client_credential,
+                token_cache=cache,
+                http_cache=self._http_cache,
+            )
+        authority = authority or self.app_settings.authority
+        app = self._local.apps.get(authority)
+        if app is None:
+            app = msal.ConfidentialClientApplication(
+                self.app_settings.client_id,
+                authority=authority,
+                client_credential=self.client_credential,
+                token_cache=thread_cache,
+                http_cache=self._http_cache,
+            )
+            self._local.apps[authority] = app
+        return app
 
     def _build_auth_code_flow(
         self, authority: Any = None, scopes: Any = None
@@ -51,6 +89,31 @@ class Auth:
             self._save_cache(cache)
             return result
 
+    @staticmethod
+    def _verdict_key(scopes: Optional[List[str]]) -> str:
+        return " ".join(sorted(scopes or []))
+
+    def _has_valid_verdict(self, scopes: Optional[List[str]]) -> bool:
+        verdict = session.get("auth_verdict")
+        return (
+            verdict is not None
+            and verdict["scopes"] == self._verdict_key(scopes)
+            and verdict["expires_at"] > time.time()
+        )
+
+    def _save_verdict(self, scopes: Optional[List[str]], token: Dict[str, Any]) -> None:
+        """Trust the session for the given scopes until the token or verdict expires.
+
+        The verdict is stored in the session, so it is dropped when the session is
+        cleared and shared by all processes.
+        """
+        ttl = min(self.verdict_ttl, float(token.get("expires_in", 0)))
+        if ttl > 0:
+            session["auth_verdict"] = {
+                "scopes": self._verdict_key(scopes),
+                "expires_at": time.time() + ttl,
+            }
+
 
 # TODO: Check ID token expiration?
 # TODO: Check other factors?
@@ -67,9 +130,11 @@ def login_required(
                     "WARNING: AUTH BYPASS IS ACTIVE. THIS SHOULD ONLY BE ACTIVE IN DEV."
                 )
                 return func(*args, **kwargs)
-            token = auth._get_token_from_cache(scopes)
-            if not token:
-                return redirect(url_for("not_signed_in", reason="login"))
+            if not auth._has_valid_verdict(scopes):
+                token = auth._get_token_from_cache(scopes)
+                if not token:
+                    return redirect(url_for("not_signed_in", reason="login"))
+                auth._save_verdict(scopes, token)
             if "roles" not in session["user"].keys() or (
                 roles and not all(role in session["user"]["roles"] for role in roles)
             ):
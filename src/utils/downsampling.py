@@ -0,0 +1,171 @@
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+Range = Tuple[Any, Any]
+
+
+def _as_float(values: Any) -> np.ndarray:
+    """Numeric view of values, datetimes become nanoseconds since the epoch."""
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype("datetime64[ns]").astype("int64").astype(float)
+    if values.dtype.kind in "OUS":
+        # Axis ranges of date axes arrive as strings from relayoutData
+        try:
+            return values.astype(float)
+        except ValueError:
+            return pd.to_datetime(values).values.astype("int64").astype(float)
+    return values.astype(float)
+
+
+def visible_range(
+    relayout_data: Optional[Dict[str, Any]], axis: str = "xaxis"
+) -> Optional[Range]:
+    """Visible range of an axis from a graph's relayoutData, None when autoranged."""
+    if not relayout_data or relayout_data.get(f"{axis}.autorange"):
+        return None
+    if f"{axis}.range[0]" in relayout_data and f"{axis}.range[1]" in relayout_data:
+        return relayout_data[f"{axis}.range[0]"], relayout_data[f"{axis}.range[1]"]
+    if f"{axis}.range" in relayout_data:
+        start, end = relayout_data[f"{axis}.range"]
+        return start, end
+    return None
+
+
+def changes_range(
+    relayout_data: Optional[Dict[str, Any]], axes: Tuple[str, ...] = ("xaxis", "yaxis")
+) -> bool:
+    """Whether a relayoutData event zooms, pans or autoranges any of the axes.
+
+    Events such as {"autosize": True} only resize the graph, its ranges stay.
+    """
+    return any(
+        key.startswith((f"{axis}.range", f"{axis}.autorange"))
+        for key in relayout_data or {}
+        for axis in axes
+    )
+
+
+def rounded_range(
+    value_range: Optional[Range], digits: int = 3
+) -> Optional[Tuple[float, float]]:
+    """value_range widened outwards to digits significant digits of its span.
+
+    Nearby zooms then map to the same range, so their outputs can be cached once.
+    Datetimes become nanoseconds since the epoch, which in_range accepts as well.
+    """
+    if value_range is None:
+        return None
+    low, high = sorted(_as_float(list(value_range)))
+    span = high - low
+    if not span > 0:
+        return float(low), float(high)
+    exponent = int(np.floor(np.log10(span))) - digits + 1
+    step = 10.0**exponent
+    return (
+        round(float(np.floor(low / step)) * step, -exponent),
+        round(float(np.ceil(high / step)) * step, -exponent),
+    )
+
+
+def in_range(
+    x: Any, y: Any, x_range: Optional[Range] = None, y_range: Optional[Range] = None
+) -> np.ndarray:
+    """Boolean mask of the points inside the given ranges."""
+    mask = np.ones(len(x), dtype=bool)
+    for values, value_range in ((x, x_range), (y, y_range)):
+        if value_range is not None:
+            low, high = sorted(_as_float(list(value_range)))
+            values = _as_float(values)
+            mask &= (values >= low) & (values <= high)
+    return mask
+
+
+def lttb(x: Any, y: Any, max_points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Downsample a line with Largest-Triangle-Three-Buckets, x must be sorted.
+
+    Keeps the first and last point and, from each bucket in between, the point
+    forming the largest triangle with the previously kept point and the average of
+    the next bucket, which preserves the visual shape including spikes.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if max_points >= len(x) or max_points < 3:
+        return x, y
+    xf = _as_float(x)
+    yf = _as_float(y)
+    edges = np.linspace(1, len(x) - 1, max_points - 1).astype(int)
+    selected = np.empty(max_points, dtype=int)
+    selected[0] = 0
+    selected[-1] = len(x) - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else len(x)
+        average_x = xf[end:next_end].mean()
+        average_y = yf[end:next_end].mean()
+        areas = np.abs(
+            (xf[previous] - average_x) * (yf[start:end] - yf[previous])
+            - (xf[previous] - xf[start:end]) * (average_y - yf[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return x[selected], y[selected]
+
+
+def downsample_line(
+    x: Any, y: Any, max_points: int, x_range: Optional[Range] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Points of a line sorted by x to draw within x_range, at most max_points.
+
+    The points just outside the range are kept so the line reaches the edges.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if x_range is not None:
+        xf = _as_float(x)
+        low, high = sorted(_as_float(list(x_range)))
+        start = max(int(np.searchsorted(xf, low, side="left")) - 1, 0)
+        end = int(np.searchsorted(xf, high, side="right")) + 1
+        x, y = x[start:end], y[start:end]
+    return lttb(x, y, max_points)
+
+
+def bin_scatter(
+    x: Any,
+    y: Any,
+    max_points: int,
+    x_range: Optional[Range] = None,
+    y_range: Optional[Range] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Aggregate the points of a scatter within the ranges on a 2-D grid.
+
+    Returns (x, y, count) with one point per non-empty cell at the mean of its
+    points, or every point with a count of 1 if there are at most max_points.
+    The grid has about max_points cells, so the output never exceeds that.
+    """
+    mask = in_range(x, y, x_range, y_range)
+    x = np.asarray(x)[mask]
+    y = np.asarray(y)[mask]
+    if len(x) <= max_points:
+        return x, y, np.ones(len(x), dtype=int)
+    xf = _as_float(x)
+    yf = _as_float(y)
+    bins = max(int(np.sqrt(max_points)), 1)
+    cells = np.zeros(len(x), dtype=np.int64)
+    for values in (xf, yf):
+        low, high = values.min(), values.max()
+        scale = bins / (high - low) if high > low else 0.0
+        cells = cells * bins + np.minimum(
+            ((values - low) * scale).astype(int), bins - 1
+        )
+    _, cell_index, counts = np.unique(cells, return_inverse=True, return_counts=True)
+    mean_x = np.bincount(cell_index, weights=xf) / counts
+    mean_y = np.bincount(cell_index, weights=yf) / counts
+    if np.issubdtype(x.dtype, np.datetime64):
+        mean_x = mean_x.astype("int64").astype("datetime64[ns]")
+    if np.issubdtype(y.dtype, np.datetime64):
+        mean_y = mean_y.astype("int64").astype("datetime64[ns]")
+    return mean_x, mean_y, counts
@@ -0,0 +1,124 @@
+import datetime
+import operator
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+# Simple predicates, e.g. ("date", ">=", "2022-01-01"), that all rows must satisfy
+Filter = Tuple[str, str, Any]
+
+_OPERATORS: Dict[str, Callable[[Any, Any], Any]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def _coerce(value: Any, like: Any) -> Any:
+    """Parse date strings in filters when the statistics are dates or timestamps."""
+    if isinstance(value, (list, tuple, set)):
+        return [_coerce(item, like) for item in value]
+    if isinstance(value, str) and isinstance(like, datetime.date):
+        timestamp = pd.Timestamp(value)
+        if isinstance(like, datetime.datetime):
+            return timestamp.to_pydatetime()
+        return timestamp.date()
+    return value
+
+
+def _may_match(minimum: Any, maximum: Any, op: str, value: Any) -> bool:
+    if op == "==":
+        return minimum <= value <= maximum
+    if op == "!=":
+        return not (minimum == maximum == value)
+    if op == "<":
+        return minimum < value
+    if op == "<=":
+        return minimum <= value
+    if op == ">":
+        return maximum > value
+    if op == ">=":
+        return maximum >= value
+    if op == "in":
+        return any(minimum <= item <= maximum for item in value)
+    raise ValueError(f"Unsupported filter operator '{op}'")
+
+
+def select_row_groups(
+    metadata: pq.FileMetaData, filters: Optional[Sequence[Filter]]
+) -> List[int]:
+    """Indices of the row groups whose min/max statistics may match all filters."""
+    columns = {
+        metadata.schema.column(index).path: index
+        for index in range(metadata.num_columns)
+    }
+    selected = []
+    for index in range(metadata.num_row_groups):
+        row_group = metadata.row_group(index)
+        keep = True
+        for column, op, value in filters or []:
+            if column not in columns:
+                raise ValueError(f"Unknown filter column '{column}'")
+            statistics = row_group.column(columns[column]).statistics
+            if statistics is None or not statistics.has_min_max:
+                continue
+            try:
+                keep = _may_match(
+                    statistics.min,
+                    statistics.max,
+                    op,
+                    _coerce(value, statistics.min),
+                )
+            except TypeError:
+                # Statistics that can't be compared with the value can't prune
+                keep = True
+            if not keep:
+                break
+        if keep:
+            selected.append(index)
+    return selected
+
+
+def filter_frame(
+    frame: pd.DataFrame, filters: Optional[Sequence[Filter]]
+) -> pd.DataFrame:
+    """Keep the rows of frame that match all filters."""
+    if not filters:
+        return frame
+    mask = pd.Series(True, index=frame.index)
+    for column, op, value in filters:
+        if len(frame):
+            value = _coerce(value, frame[column].iloc[0])
+        if op == "in":
+            mask &= frame[column].isin(value)
+        else:
+            mask &= _OPERATORS[op](frame[column], value)
+    return frame[mask]
+
+
+def read_parquet(
+    source: Any,
+    columns: Optional[List[str]] = None,
+    filters: Optional[Sequence[Filter]] = None,
+) -> pd.DataFrame:
+    """Read the given columns of the rows that match all filters from a Parquet file.
+
+    Only the row groups whose statistics may match are read from source.
+    """
+    parquet_file = pq.ParquetFile(source)
+    row_groups = select_row_groups(parquet_file.metadata, filters)
+    read_columns = columns
+    if columns is not None and filters:
+        # Filter columns are needed for the exact row filter
+        read_columns = columns + [
+            column for column, _, _ in filters if column not in columns
+        ]
+    table = parquet_file.read_row_groups(
+        row_groups, columns=read_columns, use_pandas_metadata=True
+    )
+    frame = filter_frame(table.to_pandas(), filters)
+    return frame if read_columns is columns else frame[columns]
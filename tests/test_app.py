@@ -0,0 +1,116 @@
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Union
+
+import pytest
+from azure.identity import DefaultAzureCredential
+
+import app as app_module
+import config
+from src.utils.AsyncDataLoader import SyncDataLoader
+from src.utils.DataLoader import DataLoader
+from src.utils.JobQueue import JobQueue
+
+# Set on the data_files entries from the "storagename" secret
+ACCOUNT_URL = "https://storage.blob.core.windows.net"
+SECRETS = {
+    "clientid": "client",
+    "authority": "https://login.microsoftonline.com/tenant",
+    "redirectpath": "/getAToken",
+    "secretname": "secret",
+    "storagename": "storage",
+    "roles": "reader",
+    "secret": "client secret",
+}
+
+
+class SecretClient:
+    def __init__(self, vault_url: str, credential: Any) -> None:
+        pass
+
+    def get_secret(self, name: str) -> Any:
+        return SimpleNamespace(value=SECRETS[name])
+
+    def close(self) -> None:
+        pass
+
+
+class Created:
+    """What create_app built, recorded by the patched factories."""
+
+    def __init__(self) -> None:
+        self.credentials: List[DefaultAzureCredential] = []
+        self.data_loaders: List[Union[DataLoader, SyncDataLoader]] = []
+        self.job_queues: List[JobQueue] = []
+
+
+@pytest.fixture
+def created(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Created:
+    blob_path = tmp_path / "data" / "test" / "iris.csv"
+    blob_path.parent.mkdir(parents=True)
+    blob_path.write_bytes((Path(__file__).parent / "iris.csv").read_bytes())
+    settings: Dict[str, Any] = {
+        "CACHE_DIR": str(tmp_path / "cache"),
+        "CALLBACK_CACHE_DIR": str(tmp_path / "cache" / "callbacks"),
+        "JOB_DIR": str(tmp_path / "cache" / "jobs"),
+        "SESSION_FILE_DIR": str(tmp_path / "sessions"),
+        "LOCAL_STORAGE_ROOT": str(tmp_path / "data"),
+        "PRELOAD_DASH_APPS": [config.DASH_URL_BASE + "iris-example/"],
+        "data_files": {
+            "iris": {"container": "test", "filename": "iris.csv", "backend": "local"}
+        },
+    }
+    for name, value in settings.items():
+        monkeypatch.setattr(config, name, value, raising=False)
+    monkeypatch.setenv("KEYVAULT_URI", "https://vault.vault.azure.net")
+    monkeypatch.delenv("IS_PROD", raising=False)
+    monkeypatch.setattr(app_module, "SecretClient", SecretClient)
+
+    created = Created()
+    credential = app_module._credential
+    create_data_loader = app_module._create_data_loader
+
+    class RecordedJobQueue(JobQueue):
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            super().__init__(*args, **kwargs)
+            created.job_queues.append(self)
+
+    def recorded_credential() -> DefaultAzureCredential:
+        created.credentials.append(credential())
+        return created.credentials[-1]
+
+    def recorded_data_loader(
+        credential: DefaultAzureCredential,
+    ) -> Union[DataLoader, SyncDataLoader]:
+        created.data_loaders.append(create_data_loader(credential))
+        return created.data_loaders[-1]
+
+    monkeypatch.setattr(app_module, "_credential", recorded_credential)
+    monkeypatch.setattr(app_module, "_create_data_loader", recorded_data_loader)
+    monkeypatch.setattr(app_module, "JobQueue", RecordedJobQueue)
+    return created
+
+
+def test_post_fork_recreates_the_clients_of_a_preloaded_app(created: Created) -> None:
+    app = app_module.create_app(preload=True)
+    (data_loader,) = created.data_loaders
+    (job_queue,) = created.job_queues
+    assert isinstance(data_loader, DataLoader)
+    # The preloaded Dash app loaded its data, and the clients were used, before the
+    # fork
+    assert data_loader.cache.get_metadata(
+        data_loader._data_key("local", ACCOUNT_URL, "test", "iris.csv")
+    )
+    service_client = data_loader.clients.get_service_client(ACCOUNT_URL)
+    executor = job_queue._executor
+
+    app.extensions["post_fork"]()
+    assert len(created.credentials) == 2
+    assert data_loader.credential is created.credentials[1]
+    assert data_loader.clients.credential is created.credentials[1]
+    assert data_loader.clients.get_service_client(ACCOUNT_URL) is not service_client
+    assert job_queue._executor is not executor
+    status = job_queue.wait(job_queue.submit(lambda: "done"), 5)
+    assert status is not None and status["result"] == '"done"'
+    job_queue.close()
+    data_loader.close()
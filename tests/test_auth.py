@@ -0,0 +1,189 @@
+import json
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import msal
+import pytest
+from flask import Flask, session
+from flask.testing import FlaskClient
+
+from src.models.AppSettings import AppSettings
+from src.utils import auth as auth_module
+from src.utils.auth import Auth, login_required
+
+SETTINGS = AppSettings(
+    client_id="client",
+    authority="https://login.microsoftonline.com/tenant",
+    secret_name="secret",
+    is_prod=None,
+    redirect_path="/getAToken",
+    storage_name="storage",
+    roles=["reader"],
+)
+
+
+class SecretClient:
+    def get_secret(self, name: str) -> Any:
+        return SimpleNamespace(value="client secret")
+
+
+class ConfidentialClientApplication:
+    """Stands in for the MSAL app, which discovers its authority over the network."""
+
+    def __init__(self, client_id: str, token_cache: Any, **kwargs: Any) -> None:
+        self.token_cache = token_cache
+
+
+def _token_cache(username: str) -> str:
+    """A serialized token cache holding the account of username."""
+    return json.dumps(
+        {
+            "Account": {
+                f"{username}-login.microsoftonline.com-tenant": {
+                    "home_account_id": username,
+                    "environment": "login.microsoftonline.com",
+                    "realm": "tenant",
+                    "local_account_id": username,
+                    "username": username,
+                    "authority_type": "MSSTS",
+                }
+            }
+        }
+    )
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(auth_module, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def auth(monkeypatch: pytest.MonkeyPatch) -> Auth:
+    monkeypatch.delenv("AUTH", raising=False)
+    monkeypatch.setattr(
+        auth_module.msal, "ConfidentialClientApplication", ConfidentialClientApplication
+    )
+    return Auth(SETTINGS, SecretClient(), verdict_ttl=60)  # type: ignore
+
+
+@pytest.fixture
+def server(auth: Auth) -> Flask:
+    server = Flask(__name__)
+    server.secret_key = "test"
+    server.add_url_rule("/not_signed_in", "not_signed_in", lambda: "Sign in")
+    server.add_url_rule("/access_denied", "access_denied", lambda: "Access denied")
+
+    @server.route("/logout")
+    def logout() -> str:
+        session.clear()
+        return "Signed out"
+
+    protected = login_required(auth, ["reader"], ["scope"])(lambda: "Protected")
+    server.add_url_rule("/protected", "protected", protected)
+    return server
+
+
+def test_verdict_expires_with_the_token_or_its_ttl(
+    server: Flask, auth: Auth, clock: Clock
+) -> None:
+    for expires_in, ttl in ((3600, 60), (30, 30)):
+        with server.test_request_context():
+            auth._save_verdict(["scope"], {"expires_in": expires_in})
+            clock.now += ttl - 1
+            assert auth._has_valid_verdict(["scope"])
+            clock.now += 1
+            assert not auth._has_valid_verdict(["scope"])
+    with server.test_request_context():
+        auth._save_verdict(["scope"], {"expires_in": 0})
+        assert "auth_verdict" not in session
+
+
+def test_verdict_only_covers_its_scopes(
+    server: Flask, auth: Auth, clock: Clock
+) -> None:
+    with server.test_request_context():
+        auth._save_verdict(["b", "a"], {"expires_in": 3600})
+        assert auth._has_valid_verdict(["a", "b"])
+        assert not auth._has_valid_verdict(["a"])
+        assert not auth._has_valid_verdict(["a", "b", "c"])
+        assert not auth._has_valid_verdict(None)
+
+
+def _sign_in(server: Flask, roles: List[str]) -> FlaskClient:
+    client = server.test_client()
+    with client.session_transaction() as client_session:
+        client_session["user"] = {"roles": roles}
+    return client
+
+
+def test_login_required_checks_the_token_once_per_verdict(
+    server: Flask, auth: Auth, clock: Clock
+) -> None:
+    checks: List[Optional[List[str]]] = []
+
+    def get_token_from_cache(scopes: Optional[List[str]]) -> Dict[str, Any]:
+        checks.append(scopes)
+        return {"expires_in": 3600}
+
+    auth._get_token_from_cache = get_token_from_cache  # type: ignore
+    client = _sign_in(server, ["reader"])
+    for _ in range(3):
+        assert client.get("/protected").data == b"Protected"
+    assert checks == [["scope"]]
+    clock.now += 60
+    assert client.get("/protected").data == b"Protected"
+    assert len(checks) == 2
+
+    # The roles are checked on every request, also with a valid verdict
+    with client.session_transaction() as client_session:
+        client_session["user"] = {"roles": ["writer"]}
+    response = client.get("/protected")
+    assert response.location.endswith("/access_denied?reason=login")
+    assert len(checks) == 2
+
+
+def test_logout_drops_the_verdict(server: Flask, auth: Auth, clock: Clock) -> None:
+    tokens: List[Optional[Dict[str, Any]]] = [{"expires_in": 3600}, None]
+    auth._get_token_from_cache = lambda scopes: tokens.pop(0)  # type: ignore
+    client = _sign_in(server, ["reader"])
+    assert client.get("/protected").data == b"Protected"
+    client.get("/logout")
+    response = client.get("/protected")
+    assert response.location.endswith("/not_signed_in?reason=login")
+    assert tokens == []
+
+
+def _accounts(cache: msal.SerializableTokenCache) -> List[str]:
+    accounts = json.loads(cache.serialize()).get("Account", {})
+    return [account["username"] for account in accounts.values()]
+
+
+def test_sessions_do_not_share_the_token_cache_of_a_thread(
+    server: Flask, auth: Auth
+) -> None:
+    with server.test_request_context():
+        session["token_cache"] = _token_cache("alice")
+        app = auth._build_msal_app(cache=auth._load_cache())
+        assert _accounts(app.token_cache) == ["alice"]
+    with server.test_request_context():
+        # Another session without a token cache reuses the app of the thread
+        cache = auth._load_cache()
+        assert auth._build_msal_app(cache=cache) is app
+        assert _accounts(cache) == []
+    with server.test_request_context():
+        session["token_cache"] = _token_cache("bob")
+        assert _accounts(
+            auth._build_msal_app(cache=auth._load_cache()).token_cache
+        ) == ["bob"]
+        # A sign-in flow starts from an empty cache as well
+        assert _accounts(auth._build_msal_app().token_cache) == []
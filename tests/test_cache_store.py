@@ -0,0 +1,94 @@
+import os
+from pathlib import Path
+from typing import List
+
+import pytest
+from azure.identity import DefaultAzureCredential
+
+from src.utils.CacheStore import CODECS, CacheStore
+from src.utils.DataLoader import DataLoader
+from src.utils.StorageBackend import BlobChangedError
+
+DATA = b"sepal_length,sepal_width\n" + b"5.1,3.5\n" * 1000
+PROPERTIES = {"etag": '"1"', "last_modified": "2022-01-01T00:00:00+00:00"}
+
+
+def _files(directory: Path) -> List[str]:
+    return sorted(os.listdir(directory))
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_round_trip(tmp_path: Path, codec: str) -> None:
+    store = CacheStore(tmp_path, codec)
+    metadata = store.write("key", DATA, PROPERTIES)
+    assert metadata["codec"] == codec and metadata["size"] == len(DATA)
+    assert store.get_metadata("key") == metadata
+    assert bytes(store.read("key") or b"") == DATA
+    stream = store.open("key")
+    assert stream is not None
+    with stream:
+        assert stream.read() == DATA
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_round_trip_in_chunks(tmp_path: Path, codec: str) -> None:
+    store = CacheStore(tmp_path, codec)
+    writer = store.open_writer("key")
+    for start in range(0, len(DATA), 1000):
+        writer.write(DATA[start : start + 1000])
+    metadata = writer.commit(PROPERTIES)
+    assert metadata["properties"] == PROPERTIES
+    assert bytes(store.read("key", metadata) or b"") == DATA
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_replacing_an_entry_removes_its_old_file(tmp_path: Path, codec: str) -> None:
+    store = CacheStore(tmp_path, codec)
+    old_metadata = store.write("key", DATA, PROPERTIES)
+    store.write("key", b"new", {**PROPERTIES, "etag": '"2"'})
+    assert bytes(store.read("key") or b"") == b"new"
+    assert old_metadata["file"] not in _files(tmp_path)
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_abort_keeps_the_previous_entry(tmp_path: Path, codec: str) -> None:
+    store = CacheStore(tmp_path, codec)
+    metadata = store.write("key", DATA, PROPERTIES)
+    files = _files(tmp_path)
+
+    writer = store.open_writer("key")
+    writer.write(b"partial")
+    writer.abort()
+
+    assert _files(tmp_path) == files
+    assert store.get_metadata("key") == metadata
+    assert bytes(store.read("key") or b"") == DATA
+
+
+def test_partial_stream_is_not_cached(tmp_path: Path) -> None:
+    blob_path = tmp_path / "data" / "test" / "blob.csv"
+    blob_path.parent.mkdir(parents=True)
+    blob_path.write_bytes(DATA)
+    data_loader = DataLoader(
+        DefaultAzureCredential(),
+        cache_dir=str(tmp_path / "cache"),
+        local_root=str(tmp_path / "data"),
+    )
+    chunks = data_loader.iter_chunks(
+        "", "test", "blob.csv", chunk_size=1000, backend="local"
+    )
+    assert next(chunks) == DATA[:1000]
+    # Changing the blob mid-stream fails the next range read
+    blob_path.write_bytes(DATA + b"5.1,3.5\n")
+    with pytest.raises(BlobChangedError):
+        list(chunks)
+
+    cache = data_loader.cache
+    data_key = data_loader._data_key("local", "", "test", "blob.csv")
+    assert cache.get_metadata(data_key) is None
+    assert not [name for name in _files(cache.directory) if name.endswith(".tmp")]
+
+
+def test_unknown_codec(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        CacheStore(tmp_path, "zstd")
@@ -0,0 +1,163 @@
+import gzip
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import pytest
+
+from src.utils.CompressionMiddleware import CompressionMiddleware, brotli
+
+BODY = b"<html>" + b"<p>Iris k-means clustering</p>" * 100 + b"</html>"
+
+Response = Tuple[str, Dict[str, str], bytes]
+
+
+def _app(
+    body: bytes = BODY,
+    content_type: str = "text/html; charset=utf-8",
+    status: str = "200 OK",
+    headers: Optional[List[Tuple[str, str]]] = None,
+) -> Callable:
+    def app(environ: Dict[str, Any], start_response: Callable) -> Iterable[bytes]:
+        start_response(
+            status,
+            [("Content-Type", content_type), ("Content-Length", str(len(body)))]
+            + (headers or []),
+        )
+        return [body]
+
+    return app
+
+
+def _request(
+    app: Callable, accept_encoding: str, path: str = "/", method: str = "GET"
+) -> Response:
+    response: List[Any] = []
+
+    def start_response(
+        status: str, headers: List[Tuple[str, str]], exc_info: Any = None
+    ) -> Callable:
+        response[:] = [status, dict(headers)]
+        return lambda data: None
+
+    environ = {
+        "REQUEST_METHOD": method,
+        "PATH_INFO": path,
+        "HTTP_ACCEPT_ENCODING": accept_encoding,
+    }
+    body = b"".join(app(environ, start_response))
+    return response[0], response[1], body
+
+
+def test_gzip() -> None:
+    _, headers, body = _request(CompressionMiddleware(_app()), "gzip")
+    assert headers["Content-Encoding"] == "gzip"
+    assert headers["Content-Length"] == str(len(body))
+    assert headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(body) == BODY
+
+
+@pytest.mark.skipif(brotli is None, reason="brotli is not installed")
+def test_brotli_is_preferred() -> None:
+    _, headers, body = _request(CompressionMiddleware(_app()), "gzip, deflate, br")
+    assert headers["Content-Encoding"] == "br"
+    assert brotli.decompress(body) == BODY
+
+
+def test_encodings_refused_with_q0() -> None:
+    app = CompressionMiddleware(_app())
+    _, headers, body = _request(app, "br;q=0, gzip;q=0.5")
+    assert headers["Content-Encoding"] == "gzip"
+    _, headers, body = _request(app, "br;q=0, gzip;q=0")
+    assert "Content-Encoding" not in headers and body == BODY
+    _, headers, body = _request(app, "*;q=0")
+    assert "Content-Encoding" not in headers and body == BODY
+
+
+def test_uncompressed_without_accept_encoding() -> None:
+    _, headers, body = _request(CompressionMiddleware(_app()), "")
+    assert "Content-Encoding" not in headers and body == BODY
+
+
+@pytest.mark.parametrize(
+    "app",
+    [
+        _app(body=b"<html></html>"),
+        _app(content_type="image/png"),
+        _app(status="404 NOT FOUND"),
+        _app(headers=[("Content-Encoding", "gzip")]),
+    ],
+)
+def test_passed_through(app: Callable) -> None:
+    _, headers, _ = _request(CompressionMiddleware(app), "gzip")
+    assert headers.get("Content-Encoding") in (None, "gzip")
+    assert "Vary" not in headers
+
+
+def test_etag_is_weakened() -> None:
+    app = CompressionMiddleware(_app(headers=[("ETag", '"abc"')]))
+    _, headers, _ = _request(app, "gzip")
+    assert headers["ETag"] == 'W/"abc"'
+    app = CompressionMiddleware(_app(headers=[("ETag", 'W/"abc"')]))
+    _, headers, _ = _request(app, "gzip")
+    assert headers["ETag"] == 'W/"abc"'
+
+
+def test_vary_is_extended() -> None:
+    app = CompressionMiddleware(_app(headers=[("Vary", "Cookie")]))
+    _, headers, _ = _request(app, "gzip")
+    assert headers["Vary"] == "Cookie, Accept-Encoding"
+
+
+def test_static_responses_are_compressed_once() -> None:
+    middleware = CompressionMiddleware(_app(content_type="application/javascript"))
+    compress = middleware._compress
+    calls = []
+
+    def counted(data: bytes, encoding: str, best: bool = False) -> bytes:
+        calls.append(best)
+        return compress(data, encoding, best)
+
+    middleware._compress = counted  # type: ignore
+    path = "/_dash-component-suites/dash/dash-renderer/build/dash_renderer.min.js"
+    for _ in range(3):
+        _, headers, body = _request(middleware, "gzip", path)
+        assert gzip.decompress(body) == BODY
+    # At the configured level, only precompress uses the highest one
+    assert calls == [False]
+
+
+def test_static_responses_follow_their_content() -> None:
+    bodies = [BODY, BODY.replace(b"Iris", b"Iras")]
+    assert len(bodies[0]) == len(bodies[1])
+
+    def app(environ: Dict[str, Any], start_response: Callable) -> Iterable[bytes]:
+        start_response("200 OK", [("Content-Type", "text/css")])
+        return [bodies[0]]
+
+    middleware = CompressionMiddleware(app)
+    path = "/assets/style.css"
+    assert gzip.decompress(_request(middleware, "gzip", path)[2]) == bodies[0]
+    # Edited to the same length
+    bodies.pop(0)
+    assert gzip.decompress(_request(middleware, "gzip", path)[2]) == bodies[0]
+    assert middleware.cache_stats()["entries"] == 1
+
+
+def test_static_cache_is_bounded() -> None:
+    middleware = CompressionMiddleware(
+        _app(content_type="text/css"), static_cache_bytes=1000
+    )
+    for index in range(20):
+        _request(middleware, "gzip", f"/assets/{index}.css")
+    stats = middleware.cache_stats()
+    assert stats["bytes"] <= 1000 and stats["evictions"] > 0
+
+
+def test_static_prefixes_match_after_url_base() -> None:
+    middleware = CompressionMiddleware(_app(), url_bases=("/dash/iris-example/",))
+    assert middleware._is_static("/assets/style.css")
+    assert middleware._is_static("/dash/iris-example/assets/style.css")
+    assert middleware._is_static(
+        "/dash/iris-example/_dash-component-suites/dash/dash.js"
+    )
+    assert not middleware._is_static("/api/assets/report")
+    assert not middleware._is_static("/dash/other/vendor/x.css")
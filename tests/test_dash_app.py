@@ -0,0 +1,237 @@
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterator, List, Mapping, Optional, Tuple
+
+import dash
+import pytest
+from dash import html
+from dash.dependencies import Input, Output
+from flask import Flask
+from flask.testing import FlaskClient
+
+from src.utils.JobQueue import JobQueue
+from views.DashApp import DashApp, DataSnapshot
+
+NO_UPDATE = "no_update"
+
+
+class VersionedApp(DashApp):
+    def __init__(
+        self, job_queue: Optional[JobQueue] = None, inline_layout: bool = True
+    ) -> None:
+        super().__init__(
+            "/dash/test/", job_queue=job_queue, inline_layout=inline_layout
+        )
+        self.version = "1"
+        self.loads = 0
+        self.renders = 0
+
+    def data_version(self) -> str:
+        return self.version
+
+    def load_data(self) -> Mapping[str, Any]:
+        self.loads += 1
+        return {"value": f"data {self.version}"}
+
+    def get_html(self, snapshot: DataSnapshot) -> Any:
+        self.renders += 1
+        return html.P(snapshot.data["value"])
+
+
+def _content(app: VersionedApp) -> Any:
+    """Children of the content div of the page layout."""
+    return app.onload().children[0].children
+
+
+def test_onload_renders_a_placeholder_until_the_data_is_loaded() -> None:
+    app = VersionedApp()
+    app.initialize(Flask(__name__))
+    assert _content(app) == "Loading data..."
+    assert app.loads == 0
+
+
+def test_onload_renders_the_layout_once_per_version() -> None:
+    app = VersionedApp()
+    app.initialize(Flask(__name__))
+    app.refresh_data()
+    layout = _content(app)
+    assert layout[0].children == "data 1"
+    assert _content(app) is layout
+    assert app.renders == 1
+
+    # Until the new version is loaded, the page waits for it instead
+    app.version = "2"
+    assert _content(app) == "Loading data..."
+    app.refresh_data()
+    assert _content(app)[0].children == "data 2"
+    assert app.renders == 2
+
+
+def test_onload_falls_back_to_the_placeholder() -> None:
+    app = VersionedApp(inline_layout=False)
+    app.initialize(Flask(__name__))
+    app.refresh_data()
+    assert _content(app) == "Loading data..."
+
+    app = VersionedApp()
+    app.initialize(Flask(__name__))
+    app.refresh_data()
+
+    def unavailable() -> str:
+        raise OSError("storage unavailable")
+
+    app.data_version = unavailable  # type: ignore
+    assert _content(app) == "Loading data..."
+
+
+def test_memoize_keys_outputs_by_the_snapshot_used() -> None:
+    app = VersionedApp()
+    snapshots: List[DataSnapshot] = []
+
+    @app.memoize
+    def describe(snapshot: DataSnapshot, suffix: str) -> str:
+        snapshots.append(snapshot)
+        # The data is replaced while the output is computed
+        app.version = "2"
+        app.refresh_data()
+        return f"{snapshot.data['value']} {suffix}"
+
+    assert describe("a") == "data 1 a"
+    assert snapshots[0].version == "1"
+    # Cached for the version it was computed from, not the one swapped in
+    assert describe(snapshots[0], "a") == "data 1 a"
+    assert len(snapshots) == 1
+    assert describe("a") == "data 2 a"
+    assert snapshots[1].version == "2"
+    assert app.callback_cache_stats()["describe"]["entries"] == 2
+
+
+class Background:
+    """A background callback doubling its input, run through the Dash endpoint."""
+
+    def __init__(self, app: VersionedApp) -> None:
+        self.app = app
+        self.release = threading.Event()
+        self.client: FlaskClient = app.app.server.test_client()
+
+        def prepare(value: str) -> Any:
+            return dash.no_update if value == "skip" else (value,)
+
+        @app.background_callback(
+            Output("result", "children"),
+            [Input("value", "value")],
+            inline_timeout=0.1,
+            prepare=prepare,
+            on_error=lambda error: f"failed: {error.strip().splitlines()[-1]}",
+        )
+        def double(value: str) -> str:
+            if value == "fail":
+                raise ValueError("bad value")
+            if value == "slow":
+                self.release.wait(5)
+            return value * 2
+
+    def update(
+        self, value: str, job: Any = None, poll: bool = False
+    ) -> Optional[Tuple[Any, Any, Any]]:
+        """Outputs of a request, or None if it changed none of them."""
+        outputs = [
+            ("result", "children"),
+            ("double-job", "data"),
+            ("double-poll", "disabled"),
+        ]
+        changed = "double-poll.n_intervals" if poll else "value.value"
+        response = self.client.post(
+            "/dash/test/_dash-update-component",
+            json={
+                "output": "..{}..".format(
+                    "...".join(f"{id}.{prop}" for id, prop in outputs)
+                ),
+                "outputs": [{"id": id, "property": prop} for id, prop in outputs],
+                "inputs": [
+                    {"id": "value", "property": "value", "value": value},
+                    {"id": "double-poll", "property": "n_intervals", "value": 1},
+                ],
+                "changedPropIds": [changed],
+                "state": [{"id": "double-job", "property": "data", "value": job}],
+            },
+        )
+        if response.status_code == 204:
+            return None
+        data = response.get_json()["response"]
+        output, job, disabled = (
+            data.get(id, {}).get(prop, NO_UPDATE) for id, prop in outputs
+        )
+        return output, job, disabled
+
+    def lose(self, job: Any) -> None:
+        """Remove the status of a running job, as if its status file was lost."""
+        job_queue = self.app.job_queue
+        assert job_queue is not None
+        # Once running, the job does not write its status again until it is done
+        deadline = time.time() + 5
+        while job_queue.status(job["id"])["status"] != "running":  # type: ignore
+            assert time.time() < deadline
+            time.sleep(0.01)
+        job_queue.remove(job["id"])
+
+
+@pytest.fixture
+def background(tmp_path: Path) -> Iterator[Background]:
+    job_queue = JobQueue(tmp_path / "jobs")
+    app = VersionedApp(job_queue)
+    app.initialize(Flask(__name__))
+    background = Background(app)
+    yield background
+    background.release.set()
+    job_queue.close()
+
+
+def test_background_callback_returns_fast_jobs_inline(background: Background) -> None:
+    assert background.update("a") == ("aa", None, True)
+
+
+def test_background_callback_polls_slow_jobs(background: Background) -> None:
+    output, job, disabled = background.update("slow")  # type: ignore
+    assert (output, disabled) == (NO_UPDATE, False)
+    assert background.update("slow", job, poll=True) == (NO_UPDATE, job, False)
+    background.release.set()
+    background.app.job_queue.wait(job["id"], 5)  # type: ignore
+    assert background.update("slow", job, poll=True) == ("slowslow", None, True)
+    # The status file is removed once the result is delivered
+    assert background.app.job_queue.status(job["id"]) is None  # type: ignore
+
+
+def test_background_callback_resubmits_a_lost_job(background: Background) -> None:
+    _, job, _ = background.update("slow")  # type: ignore
+    background.lose(job)
+    output, resubmitted, disabled = background.update(  # type: ignore
+        "slow", job, poll=True
+    )
+    assert (output, disabled) == (NO_UPDATE, False)
+    assert resubmitted["id"] != job["id"] and resubmitted["resubmitted"]
+    background.release.set()
+    background.app.job_queue.wait(resubmitted["id"], 5)  # type: ignore
+    assert background.update("slow", resubmitted, poll=True) == (
+        "slowslow",
+        None,
+        True,
+    )
+
+
+def test_background_callback_reports_errors(background: Background) -> None:
+    assert background.update("fail") == ("failed: ValueError: bad value", None, True)
+    _, job, _ = background.update("slow")  # type: ignore
+    background.lose(job)
+    _, job, _ = background.update("slow", job, poll=True)  # type: ignore
+    background.lose(job)
+    output, job, disabled = background.update("slow", job, poll=True)  # type: ignore
+    assert output.startswith("failed: Job ") and output.endswith(" was lost")
+    assert (job, disabled) == (None, True)
+
+
+def test_background_callback_skips_what_prepare_rejects(
+    background: Background,
+) -> None:
+    assert background.update("skip") is None
@@ -0,0 +1,90 @@
+import time
+from types import SimpleNamespace
+from typing import Any, Mapping
+
+from dash import html
+from flask import Flask
+
+from src.models.AppSettings import AppSettings
+from src.utils.auth import Auth, login_required
+from views.DashApp import DashApp, DataSnapshot
+from views.DashAppRegistry import DashAppRegistry
+
+
+class CountingApp(DashApp):
+    def __init__(self, url_base: str) -> None:
+        super().__init__(url_base)
+        self.initializations = 0
+
+    def initialize(self, server: Flask) -> None:
+        self.initializations += 1
+        super().initialize(server)
+
+    def load_data(self) -> Mapping[str, Any]:
+        return {}
+
+    def get_html(self, snapshot: DataSnapshot) -> Any:
+        return html.P(self.url_base)
+
+
+def test_apps_are_initialized_on_their_first_request() -> None:
+    server = Flask(__name__)
+    registry = DashAppRegistry(server)
+    first, second, preloaded = (
+        CountingApp(url_base) for url_base in ("/dash/a/", "/dash/b/", "/dash/c/")
+    )
+    registry.register(first)
+    registry.register(second)
+    registry.register(preloaded, preload=True)
+    assert (first.initializations, second.initializations) == (0, 0)
+    assert preloaded.initializations == 1
+
+    client = server.test_client()
+    assert client.get("/dash/a/").status_code == 200
+    assert client.get("/dash/a/_dash-layout").status_code == 200
+    assert (first.initializations, second.initializations) == (1, 0)
+    assert client.get("/dash/c/").status_code == 200
+    assert preloaded.initializations == 1
+    assert registry.get_server(first) is not registry.get_server(preloaded)
+
+
+class SecretClient:
+    def get_secret(self, name: str) -> Any:
+        return SimpleNamespace(value="client secret")
+
+
+def test_forwarding_views_are_wrapped_with_the_decorator() -> None:
+    server = Flask(__name__)
+    server.secret_key = "test"
+    server.add_url_rule("/not_signed_in", "not_signed_in", lambda: "Sign in")
+    settings = AppSettings(
+        client_id="client",
+        authority="https://login.microsoftonline.com/tenant",
+        secret_name="secret",
+        is_prod=None,
+        redirect_path="/getAToken",
+        storage_name="storage",
+        roles=["reader"],
+    )
+    auth = Auth(settings, SecretClient())  # type: ignore
+    # Signed out, no token in the session
+    auth._get_token_from_cache = lambda scopes: None  # type: ignore
+    registry = DashAppRegistry(server, login_required(auth, settings.roles, []))
+    dash_app = CountingApp("/dash/a/")
+    registry.register(dash_app)
+
+    client = server.test_client()
+    for response in (
+        client.get("/dash/a/"),
+        client.post("/dash/a/_dash-update-component"),
+    ):
+        assert response.status_code == 302
+        assert response.location.endswith("/not_signed_in?reason=login")
+    # Not built for requests that were refused
+    assert dash_app.initializations == 0
+
+    with client.session_transaction() as session:
+        session["user"] = {"roles": ["reader"]}
+        session["auth_verdict"] = {"scopes": "", "expires_at": time.time() + 60}
+    assert client.get("/dash/a/").status_code == 200
+    assert dash_app.initializations == 1
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+from src.utils.downsampling import (
+    bin_scatter,
+    changes_range,
+    downsample_line,
+    in_range,
+    lttb,
+    rounded_range,
+)
+
+
+def test_lttb_keeps_endpoints_and_max_points() -> None:
+    x = np.arange(1000)
+    y = np.sin(x / 50)
+    sampled_x, sampled_y = lttb(x, y, 100)
+    assert len(sampled_x) == len(sampled_y) == 100
+    assert sampled_x[0] == 0 and sampled_x[-1] == 999
+    assert np.all(np.diff(sampled_x) > 0)
+    np.testing.assert_array_equal(sampled_y, y[sampled_x])
+
+
+def test_lttb_keeps_spikes() -> None:
+    x = np.arange(1000)
+    y = np.zeros(1000)
+    y[437] = 10.0
+    sampled_x, _ = lttb(x, y, 20)
+    assert 437 in sampled_x
+
+
+def test_lttb_returns_short_lines_unchanged() -> None:
+    x = np.arange(10)
+    y = x * 2
+    for max_points in (10, 20, 2):
+        sampled_x, sampled_y = lttb(x, y, max_points)
+        np.testing.assert_array_equal(sampled_x, x)
+        np.testing.assert_array_equal(sampled_y, y)
+
+
+def test_downsample_line_keeps_points_just_outside_range() -> None:
+    x = np.arange(100)
+    sampled_x, _ = downsample_line(x, x, 1000, x_range=(10.5, 20.5))
+    assert sampled_x[0] == 10 and sampled_x[-1] == 21
+
+
+def test_in_range_parses_date_strings() -> None:
+    x = pd.date_range("2022-01-01", periods=10, freq="D").values
+    mask = in_range(x, np.arange(10), x_range=("2022-01-03", "2022-01-05"))
+    np.testing.assert_array_equal(np.flatnonzero(mask), [2, 3, 4])
+
+
+def test_bin_scatter_bounds_output_and_keeps_counts() -> None:
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=10000)
+    y = rng.normal(size=10000)
+    binned_x, binned_y, counts = bin_scatter(x, y, 400)
+    assert len(binned_x) == len(binned_y) == len(counts) <= 400
+    assert counts.sum() == 10000
+    assert x.min() <= binned_x.min() and binned_x.max() <= x.max()
+
+
+def test_bin_scatter_only_aggregates_points_in_range() -> None:
+    x = np.arange(1000, dtype=float)
+    y = np.arange(1000, dtype=float)
+    binned_x, _, counts = bin_scatter(x, y, 100, x_range=(0, 499), y_range=(100, 999))
+    assert counts.sum() == 400
+    assert binned_x.min() >= 100 and binned_x.max() <= 499
+
+
+def test_bin_scatter_returns_few_points_unchanged() -> None:
+    x = pd.date_range("2022-01-01", periods=5, freq="D").values
+    binned_x, binned_y, counts = bin_scatter(x, np.arange(5), 10)
+    np.testing.assert_array_equal(binned_x, x)
+    np.testing.assert_array_equal(counts, np.ones(5))
+
+
+def test_bin_scatter_keeps_datetime_axes() -> None:
+    x = pd.date_range("2022-01-01", periods=1000, freq="H").values
+    binned_x, _, counts = bin_scatter(x, np.arange(1000), 100)
+    assert np.issubdtype(binned_x.dtype, np.datetime64)
+    assert x.min() <= binned_x.min() and binned_x.max() <= x.max()
+    assert counts.sum() == 1000
+
+
+def test_changes_range() -> None:
+    assert not changes_range(None)
+    assert not changes_range({"autosize": True})
+    assert changes_range({"xaxis.range[0]": 1.0, "xaxis.range[1]": 2.0})
+    assert changes_range({"yaxis.range": [1.0, 2.0]})
+    assert changes_range({"xaxis.autorange": True, "yaxis.autorange": True})
+    assert not changes_range({"yaxis.range": [1.0, 2.0]}, axes=("xaxis",))
+
+
+def test_rounded_range_covers_the_range() -> None:
+    assert rounded_range(None) is None
+    assert rounded_range((4.3123, 7.9876)) == (4.31, 7.99)
+    assert rounded_range((7.9876, 4.3123)) == (4.31, 7.99)
+    # Nearby zooms share one range
+    assert rounded_range((4.3141, 7.9811)) == (4.31, 7.99)
+    low, high = rounded_range(("2020-01-01", "2020-02-01"))  # type: ignore
+    mask = in_range(
+        pd.date_range("2019-12-31", periods=4, freq="15D"), np.zeros(4), (low, high)
+    )
+    assert mask.tolist() == [False, True, True, False]
@@ -0,0 +1,71 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils.FrameCache import FrameCache
+
+OPTIONS = {"index_col": 0}
+
+
+def _frame(rows: int = 100) -> pd.DataFrame:
+    return pd.DataFrame(
+        {"value": np.arange(rows, dtype=float), "name": [f"n{i}" for i in range(rows)]}
+    )
+
+
+def test_racing_writers_parse_once(tmp_path: Path) -> None:
+    # One FrameCache per writer stands in for a process, they share the lock file
+    frame_caches = [FrameCache(tmp_path) for _ in range(8)]
+    started = threading.Barrier(8)
+    parses: List[int] = []
+
+    def parse() -> pd.DataFrame:
+        parses.append(1)
+        time.sleep(0.1)
+        return _frame()
+
+    def load(frame_cache: FrameCache) -> pd.DataFrame:
+        started.wait(5)
+        return frame_cache.get_or_put("iris", '"etag1"', OPTIONS, parse)
+
+    with ThreadPoolExecutor(8) as executor:
+        frames = list(executor.map(load, frame_caches))
+    assert len(parses) == 1
+    for frame in frames:
+        pd.testing.assert_frame_equal(frame, _frame())
+
+
+def test_new_versions_replace_old_files(tmp_path: Path) -> None:
+    frame_cache = FrameCache(tmp_path)
+    frame_cache.get_or_put("iris", '"etag1"', OPTIONS, _frame)
+    frame_cache.get_or_put("iris", '"etag1"', {}, _frame)
+    frame_cache.get_or_put("other", '"etag1"', OPTIONS, _frame)
+    assert len(list(tmp_path.glob("*.arrow"))) == 3
+
+    frame = frame_cache.get_or_put("iris", '"etag2"', OPTIONS, lambda: _frame(50))
+    assert len(frame) == 50
+    assert frame_cache.get("iris", '"etag1"', OPTIONS) is None
+    # Other sources, and other options of the same source, are kept
+    assert frame_cache.get("iris", '"etag1"', {}) is not None
+    assert frame_cache.get("other", '"etag1"', OPTIONS) is not None
+    assert len(list(tmp_path.glob("*.arrow"))) == 3
+
+
+def test_numeric_columns_are_read_only_views(tmp_path: Path) -> None:
+    frame_cache = FrameCache(tmp_path)
+    frame = frame_cache.get_or_put("iris", '"etag1"', OPTIONS, _frame)
+    values = frame["value"].to_numpy()
+    assert not values.flags.writeable
+    with pytest.raises(ValueError):
+        values[0] = 1.0
+    # A copy can be modified, and leaves the cached file as it is
+    copy = frame.copy()
+    copy.loc[0, "value"] = 1.0
+    cached = frame_cache.get("iris", '"etag1"', OPTIONS)
+    assert cached is not None and cached.loc[0, "value"] == 0.0
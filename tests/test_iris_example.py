@@ -0,0 +1,36 @@
+from pathlib import Path
+from typing import Any, Dict
+
+from src.utils.DataLoader import DataLoader
+from views.IrisExample import IrisExample
+
+
+def _iris_example(tmp_path: Path, **data_file: Any) -> IrisExample:
+    blob_path = tmp_path / "data" / "test" / "iris.csv"
+    blob_path.parent.mkdir(parents=True)
+    blob_path.write_bytes((Path(__file__).parent / "iris.csv").read_bytes())
+    data_loader = DataLoader(
+        None, cache_dir=str(tmp_path / "cache"), local_root=str(tmp_path / "data")
+    )
+    data_files: Dict[str, Any] = {
+        "iris": {
+            "account_url": "",
+            "container": "test",
+            "filename": "iris.csv",
+            "backend": "local",
+            **data_file,
+        }
+    }
+    return IrisExample("/dash/iris-example/", {"name": "Iris"}, data_loader, data_files)
+
+
+def test_load_data_uses_the_first_column_as_index(tmp_path: Path) -> None:
+    iris = _iris_example(tmp_path).load_data()["iris"]
+    assert list(iris.index[:3]) == [0, 1, 2]
+    assert iris.columns[0] == "sepal length (cm)"
+
+
+def test_load_data_merges_read_options(tmp_path: Path) -> None:
+    iris = _iris_example(tmp_path, read_options={"nrows": 2}).load_data()["iris"]
+    assert len(iris) == 2
+    assert iris.columns[0] == "sepal length (cm)"
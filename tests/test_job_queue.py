@@ -0,0 +1,76 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from src.utils.JobQueue import JobQueue
+
+
+def test_results_and_errors_are_stored(tmp_path: Path) -> None:
+    job_queue = JobQueue(tmp_path)
+    job_id = job_queue.submit(lambda a, b: {"sum": a + b}, 1, 2)
+    status = job_queue.wait(job_id, 5)
+    assert status is not None and status["status"] == "done"
+    assert status["result"] == '{"sum": 3}'
+
+    def fail() -> None:
+        raise ValueError("bad input")
+
+    status = job_queue.wait(job_queue.submit(fail), 5)
+    assert status is not None and status["status"] == "error"
+    assert "ValueError: bad input" in status["error"]
+    job_queue.close()
+
+
+def test_status_is_shared_through_the_directory(tmp_path: Path) -> None:
+    job_queue = JobQueue(tmp_path)
+    other_process = JobQueue(tmp_path)
+    release = threading.Event()
+    job_id = job_queue.submit(release.wait, 5)
+    assert job_queue.wait(job_id, 0.1)["status"] in ("queued", "running")  # type: ignore
+    assert other_process.status(job_id)["status"] in ("queued", "running")  # type: ignore
+    release.set()
+    status = other_process.wait(job_id, 5)
+    assert status is not None and status["status"] == "done"
+    job_queue.remove(job_id)
+    assert other_process.status(job_id) is None
+    job_queue.close()
+    other_process.close()
+
+
+def test_slots_are_shared_by_all_queues_of_a_directory(tmp_path: Path) -> None:
+    # Each queue stands in for a process, the slot locks are files in the directory
+    job_queues = [JobQueue(tmp_path, max_workers=1) for _ in range(3)]
+    lock = threading.Lock()
+    running: List[int] = [0, 0]
+
+    def job() -> None:
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+
+    job_ids = [job_queue.submit(job) for job_queue in job_queues for _ in range(2)]
+    for job_id in job_ids:
+        status = job_queues[0].wait(job_id, 5)
+        assert status is not None and status["status"] == "done"
+    assert running[1] == 1
+    for job_queue in job_queues:
+        job_queue.close()
+
+
+@pytest.mark.parametrize("age, kept", [(10, True), (7200, False)])
+def test_old_status_files_are_removed(tmp_path: Path, age: float, kept: bool) -> None:
+    job_queue = JobQueue(tmp_path, max_age=3600)
+    job_id = job_queue.submit(lambda: None)
+    job_queue.wait(job_id, 5)
+    modified = time.time() - age
+    os.utime(tmp_path / f"{job_id}.json", (modified, modified))
+    job_queue.wait(job_queue.submit(lambda: None), 5)
+    assert (job_queue.status(job_id) is not None) == kept
+    job_queue.close()
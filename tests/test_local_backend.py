@@ -0,0 +1,97 @@
+import os
+from pathlib import Path
+
+import pytest
+from azure.identity.aio import DefaultAzureCredential as AsyncDefaultAzureCredential
+
+from src.utils.AsyncDataLoader import AsyncDataLoader, SyncDataLoader
+from src.utils.DataLoader import DataLoader
+from src.utils.LocalBackend import LocalBackend
+from src.utils.StorageBackend import BlobChangedError
+
+DATA = b"sepal_length,species\n5.1,setosa\n7.0,versicolor\n6.3,virginica\n"
+
+
+@pytest.fixture
+def root(tmp_path: Path) -> Path:
+    (tmp_path / "test" / "nested").mkdir(parents=True)
+    (tmp_path / "test" / "iris.csv").write_bytes(DATA)
+    (tmp_path / "test" / "nested" / "iris.csv").write_bytes(DATA)
+    (tmp_path / "other").mkdir()
+    (tmp_path / "other" / "iris.csv").write_bytes(DATA)
+    return tmp_path
+
+
+def _modify(path: Path, data: bytes) -> None:
+    # Also move the mtime on, in case the file system has a coarse resolution
+    stat = path.stat()
+    path.write_bytes(data)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_download_and_ranges(root: Path) -> None:
+    blob = LocalBackend(root).get_blob("", "test", "iris.csv")
+    download = blob.download()
+    assert download.properties.size == len(DATA)
+    assert download.readall() == DATA
+    ranged = blob.download(offset=5, length=10)
+    assert ranged.properties.size == len(DATA)
+    assert ranged.readall() == DATA[5:15]
+    assert blob.read_range(0, 12) == DATA[:12]
+
+
+def test_etag_changes_with_the_file(root: Path) -> None:
+    blob = LocalBackend(root).get_blob("", "test", "iris.csv")
+    etag = blob.get_properties().etag
+    assert blob.get_properties().etag == etag
+    assert blob.download_if_modified(etag) is None
+
+    _modify(root / "test" / "iris.csv", DATA + b"5.9,virginica\n")
+    assert blob.get_properties().etag != etag
+    download = blob.download_if_modified(etag)
+    assert download is not None
+    assert download.readall() == DATA + b"5.9,virginica\n"
+    with pytest.raises(BlobChangedError):
+        blob.read_range(0, 12, etag)
+
+
+def test_list(root: Path) -> None:
+    backend = LocalBackend(root)
+    assert backend.list("", "test") == ["iris.csv", "nested/iris.csv"]
+    assert backend.list("", "test", "nested/") == ["nested/iris.csv"]
+    assert backend.list("", "other") == ["iris.csv"]
+
+
+def test_data_loader(root: Path, tmp_path: Path) -> None:
+    data_loader = DataLoader(
+        None, cache_dir=str(tmp_path / "cache"), local_root=str(root)
+    )
+    blob = LocalBackend(root).get_blob("", "test", "iris.csv")
+    assert data_loader.get("", "test", "iris.csv", backend="local").read() == DATA
+    version = data_loader.version("", "test", "iris.csv", backend="local")
+    assert version == blob.get_properties().etag
+    assert data_loader.list("", "test", "nested/", backend="local") == [
+        "nested/iris.csv"
+    ]
+    data_loader.close()
+
+
+def test_async_data_loader(root: Path, tmp_path: Path) -> None:
+    with SyncDataLoader(
+        AsyncDataLoader(
+            AsyncDefaultAzureCredential(),
+            cache_dir=str(tmp_path / "cache"),
+            local_root=str(root),
+        )
+    ) as data_loader:
+        data_file = {"container": "test", "filename": "iris.csv", "backend": "local"}
+        assert data_loader.get("", **data_file).read() == DATA
+        frame = data_loader.get_dataframe("", **data_file)
+        assert list(frame["species"]) == ["setosa", "versicolor", "virginica"]
+        etag = LocalBackend(root).get_blob("", "test", "iris.csv").get_properties().etag
+        assert frame.attrs["etag"] == etag
+        assert data_loader.version("", **data_file) == etag
+        assert data_loader.list("", "test", backend="local") == [
+            "iris.csv",
+            "nested/iris.csv",
+        ]
@@ -0,0 +1,55 @@
+from src.utils.MemoryCache import MemoryCache
+
+
+def test_least_recently_used_entries_are_evicted() -> None:
+    cache = MemoryCache(300)
+    for key in ("a", "b", "c"):
+        cache.put(key, "1", bytes(100))
+    # Reading "a" makes "b" the least recently used entry
+    assert cache.get("a", "1") is not None
+    cache.put("d", "1", bytes(100))
+    assert cache.get("b", "1") is None
+    assert all(cache.get(key, "1") is not None for key in ("a", "c", "d"))
+    # An entry larger than the others evicts as many as needed
+    cache.put("e", "1", bytes(250))
+    assert [key for key in "acde" if cache.get(key, "1") is not None] == ["e"]
+
+
+def test_oversize_entries_are_returned_but_not_cached() -> None:
+    cache = MemoryCache(100)
+    cache.put("a", "1", bytes(50))
+    view = cache.put("b", "1", bytes(150))
+    assert view.nbytes == 150
+    assert cache.get("b", "1") is None
+    # The cached entries stay
+    assert cache.get("a", "1") is not None
+    # Replacing an entry with an oversize version drops the old one
+    cache.put("a", "2", bytes(150))
+    assert cache.get("a", "1") is None
+
+
+def test_other_versions_miss_and_replace_the_entry() -> None:
+    cache = MemoryCache(1000)
+    cache.put("a", "1", b"old")
+    assert cache.get("a", "2") is None
+    # The stale entry was dropped by the miss
+    assert cache.get("a", "1") is None
+    cache.put("a", "2", b"new")
+    assert bytes(cache.get("a", "2") or b"") == b"new"
+
+
+def test_stats() -> None:
+    cache = MemoryCache(200)
+    cache.put("a", "1", bytes(100))
+    cache.put("b", "1", bytes(100))
+    cache.get("a", "1")
+    cache.get("c", "1")
+    cache.put("c", "1", bytes(50))
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 1,
+        "evictions": 1,
+        "entries": 2,
+        "bytes": 150,
+        "max_bytes": 200,
+    }
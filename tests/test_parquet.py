@@ -0,0 +1,64 @@
+import io
+from typing import List
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.utils.parquet import Filter, read_parquet, select_row_groups
+
+
+def _parquet_file(frame: pd.DataFrame, row_group_size: int) -> io.BytesIO:
+    buffer = io.BytesIO()
+    pq.write_table(
+        pa.Table.from_pandas(frame, preserve_index=False),
+        buffer,
+        row_group_size=row_group_size,
+    )
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.fixture
+def frame() -> pd.DataFrame:
+    # Four row groups of 25 rows, with increasing values and dates
+    return pd.DataFrame(
+        {
+            "value": range(100),
+            "date": pd.date_range("2022-01-01", periods=100, freq="D"),
+            "name": [f"name{index // 25}" for index in range(100)],
+        }
+    )
+
+
+def _row_groups(frame: pd.DataFrame, filters: List[Filter]) -> List[int]:
+    metadata = pq.ParquetFile(_parquet_file(frame, 25)).metadata
+    return select_row_groups(metadata, filters)
+
+
+def test_select_row_groups_prunes_by_statistics(frame: pd.DataFrame) -> None:
+    assert _row_groups(frame, []) == [0, 1, 2, 3]
+    assert _row_groups(frame, [("value", "==", 30)]) == [1]
+    assert _row_groups(frame, [("value", "<", 25)]) == [0]
+    assert _row_groups(frame, [("value", ">=", 75)]) == [3]
+    assert _row_groups(frame, [("value", "in", [10, 60])]) == [0, 2]
+    assert _row_groups(frame, [("value", ">", 10), ("value", "<=", 40)]) == [0, 1]
+    assert _row_groups(frame, [("value", ">", 1000)]) == []
+
+
+def test_select_row_groups_parses_date_strings(frame: pd.DataFrame) -> None:
+    assert _row_groups(frame, [("date", ">=", "2022-03-27")]) == [3]
+
+
+def test_select_row_groups_rejects_unknown_columns(frame: pd.DataFrame) -> None:
+    with pytest.raises(ValueError):
+        _row_groups(frame, [("missing", "==", 1)])
+
+
+def test_read_parquet_filters_rows_and_columns(frame: pd.DataFrame) -> None:
+    result = read_parquet(
+        _parquet_file(frame, 25), ["name"], [("value", ">=", 20), ("value", "<", 30)]
+    )
+    assert list(result.columns) == ["name"]
+    assert list(result["name"]) == ["name0"] * 5 + ["name1"] * 5
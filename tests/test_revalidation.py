@@ -0,0 +1,188 @@
+import os
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+import pytest
+
+from src.utils.DataLoader import DataLoader
+from src.utils.LocalBackend import LocalBackend
+from src.utils.StorageBackend import BlobHandle, BlobInfo, Download
+
+TTL = 0.5
+DATA = b"sepal_length,species\n5.1,setosa\n7.0,versicolor\n6.3,virginica\n"
+
+
+class CountingBlobHandle(BlobHandle):
+    """Records the requests sent for a blob of a LocalBackend."""
+
+    def __init__(self, blob: BlobHandle, requests: List[str]) -> None:
+        super().__init__(blob.name)
+        self.blob = blob
+        self.requests = requests
+
+    def download(
+        self, offset: Optional[int] = None, length: Optional[int] = None
+    ) -> Download:
+        self.requests.append("download")
+        return self.blob.download(offset, length)
+
+    def download_if_modified(
+        self, etag: str, offset: Optional[int] = None, length: Optional[int] = None
+    ) -> Optional[Download]:
+        download = self.blob.download_if_modified(etag, offset, length)
+        self.requests.append("download" if download is not None else "not_modified")
+        return download
+
+    def read_range(self, offset: int, length: int, etag: Optional[str] = None) -> bytes:
+        self.requests.append("read_range")
+        return self.blob.read_range(offset, length, etag)
+
+    def get_properties(self) -> BlobInfo:
+        self.requests.append("get_properties")
+        return self.blob.get_properties()
+
+
+class CountingBackend(LocalBackend):
+    def __init__(self, root: Path) -> None:
+        super().__init__(root)
+        self.requests: List[str] = []
+
+    def get_blob(self, account_url: str, container: str, filename: str) -> BlobHandle:
+        blob = super().get_blob(account_url, container, filename)
+        return CountingBlobHandle(blob, self.requests)
+
+
+def _modify(path: Path, data: bytes) -> None:
+    # Also move the mtime on, in case the file system has a coarse resolution
+    stat = path.stat()
+    path.write_bytes(data)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def backend(tmp_path: Path) -> CountingBackend:
+    (tmp_path / "data" / "test").mkdir(parents=True)
+    return CountingBackend(tmp_path / "data")
+
+
+@pytest.fixture
+def data_loader(tmp_path: Path, backend: CountingBackend) -> DataLoader:
+    return DataLoader(
+        None, cache_dir=str(tmp_path / "cache"), backends={"local": backend}
+    )
+
+
+def test_parquet_properties_are_revalidated_after_ttl(
+    backend: CountingBackend, data_loader: DataLoader
+) -> None:
+    path = backend.root / "test" / "values.parquet"
+    pd.DataFrame({"value": range(10)}).to_parquet(path)
+
+    def load() -> pd.DataFrame:
+        return data_loader.get_dataframe(
+            "", "test", "values.parquet", ttl=TTL, backend="local", format="parquet"
+        )
+
+    assert list(load()["value"]) == list(range(10))
+    assert backend.requests[0] == "get_properties"
+    assert set(backend.requests[1:]) == {"read_range"}
+
+    # Within ttl, neither the properties nor the content are requested
+    backend.requests.clear()
+    load()
+    assert backend.requests == []
+
+    # After ttl, only the properties are requested while the blob is unchanged
+    time.sleep(TTL)
+    load()
+    load()
+    assert backend.requests == ["get_properties"]
+
+    backend.requests.clear()
+    # A different size, so the ETag of the LocalBackend changes
+    pd.DataFrame({"value": range(20)}).to_parquet(path)
+    time.sleep(TTL)
+    assert list(load()["value"]) == list(range(20))
+    assert backend.requests[0] == "get_properties"
+    assert "read_range" in backend.requests
+
+
+def test_version_marks_the_cached_copy_as_validated(
+    backend: CountingBackend, data_loader: DataLoader
+) -> None:
+    (backend.root / "test" / "iris.csv").write_bytes(DATA)
+    data_loader.get("", "test", "iris.csv", ttl=TTL, backend="local")
+    etag = backend.get_blob("", "test", "iris.csv").get_properties().etag
+    backend.requests.clear()
+    assert data_loader.version("", "test", "iris.csv", TTL, "local") == etag
+    assert backend.requests == []
+
+    time.sleep(TTL)
+    assert data_loader.version("", "test", "iris.csv", TTL, "local") == etag
+    assert backend.requests == ["get_properties"]
+    # The check renewed the ttl of the cached copy for both version and get
+    assert data_loader.version("", "test", "iris.csv", TTL, "local") == etag
+    data_loader.get("", "test", "iris.csv", ttl=TTL, backend="local")
+    assert backend.requests == ["get_properties"]
+
+
+def test_version_serves_the_cached_copy_while_it_is_refreshed(
+    tmp_path: Path, backend: CountingBackend
+) -> None:
+    path = backend.root / "test" / "iris.csv"
+    path.write_bytes(DATA)
+    data_loader = DataLoader(
+        None,
+        cache_dir=str(tmp_path / "cache"),
+        stale_while_revalidate=True,
+        backends={"local": backend},
+    )
+    data_loader.get("", "test", "iris.csv", ttl=TTL, backend="local")
+    etag = backend.get_blob("", "test", "iris.csv").get_properties().etag
+    path.write_bytes(DATA + b"5.9,virginica\n")
+    new_etag = backend.get_blob("", "test", "iris.csv").get_properties().etag
+    time.sleep(TTL)
+    backend.requests.clear()
+    assert data_loader.version("", "test", "iris.csv", TTL, "local") == etag
+    data_loader.close()
+    # The refresh downloaded the new version in the background
+    assert backend.requests == ["download"]
+    assert data_loader.version("", "test", "iris.csv", TTL, "local") == new_etag
+    assert backend.requests == ["download"]
+
+
+def test_get_revalidates_with_conditional_downloads(
+    backend: CountingBackend, data_loader: DataLoader
+) -> None:
+    path = backend.root / "test" / "iris.csv"
+    path.write_bytes(DATA)
+    data_key = data_loader._data_key("local", "", "test", "iris.csv")
+
+    def get() -> bytes:
+        return data_loader.get("", "test", "iris.csv", ttl=TTL, backend="local").read()
+
+    assert get() == DATA
+    assert backend.requests == ["download"]
+    validated_at = data_loader.cache.get_metadata(data_key)["validated_at"]  # type: ignore
+
+    # Within ttl the cached copy is served without a request
+    get()
+    assert backend.requests == ["download"]
+
+    # After ttl an unchanged blob costs one conditional request, which renews ttl
+    time.sleep(TTL)
+    assert get() == DATA
+    assert backend.requests == ["download", "not_modified"]
+    metadata = data_loader.cache.get_metadata(data_key)
+    assert metadata is not None and metadata["validated_at"] > validated_at
+    get()
+    assert backend.requests == ["download", "not_modified"]
+
+    # A changed blob is downloaded again once ttl has passed
+    _modify(path, DATA + b"5.9,virginica\n")
+    assert get() == DATA
+    time.sleep(TTL)
+    assert get() == DATA + b"5.9,virginica\n"
+    assert backend.requests == ["download", "not_modified", "download"]
@@ -0,0 +1,86 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+from azure.identity import DefaultAzureCredential
+
+from src.utils.DataLoader import DataLoader
+from src.utils.LocalBackend import LocalBackend, LocalBlobHandle
+from src.utils.SingleFlight import SingleFlight
+from src.utils.StorageBackend import BlobHandle, Download
+
+
+def test_concurrent_calls_share_one_result() -> None:
+    single_flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def work() -> int:
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 42
+
+    with ThreadPoolExecutor(8) as executor:
+        leader = executor.submit(single_flight.do, "key", work)
+        started.wait(5)
+        followers = [executor.submit(single_flight.do, "key", work) for _ in range(7)]
+        time.sleep(0.1)
+        release.set()
+        results = [leader.result()] + [future.result() for future in followers]
+    assert results == [42] * 8
+    assert len(calls) == 1
+    # The next call after the shared one completed runs again
+    assert single_flight.do("key", lambda: 43) == 43
+
+
+def test_exceptions_are_shared_and_not_cached() -> None:
+    single_flight = SingleFlight()
+
+    def fail() -> None:
+        raise ValueError("failed")
+
+    with pytest.raises(ValueError):
+        single_flight.do("key", fail)
+    assert single_flight.do("key", lambda: 1) == 1
+
+
+class CountingBlobHandle(LocalBlobHandle):
+    downloads: List[Optional[int]] = []
+
+    def download(
+        self, offset: Optional[int] = None, length: Optional[int] = None
+    ) -> Download:
+        self.downloads.append(offset)
+        time.sleep(0.2)
+        return super().download(offset, length)
+
+
+class CountingBackend(LocalBackend):
+    def get_blob(self, account_url: str, container: str, filename: str) -> BlobHandle:
+        return CountingBlobHandle(self.root / container / filename, filename)
+
+
+def test_concurrent_cache_misses_download_once(tmp_path: Path) -> None:
+    blob_path = tmp_path / "data" / "test" / "iris.csv"
+    blob_path.parent.mkdir(parents=True)
+    blob_path.write_bytes((Path(__file__).parent / "iris.csv").read_bytes())
+    data_loader = DataLoader(
+        DefaultAzureCredential(),
+        cache_dir=str(tmp_path / "cache"),
+        local_root=str(tmp_path / "data"),
+    )
+    data_loader.backends["local"] = CountingBackend(tmp_path / "data")
+    CountingBlobHandle.downloads = []
+
+    def get(_: int) -> bytes:
+        return data_loader.get("", "test", "iris.csv", backend="local").read()
+
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(get, range(8)))
+    assert results == [blob_path.read_bytes()] * 8
+    assert len(CountingBlobHandle.downloads) == 1
@@ -1,52 +1,434 @@
 import abc
+import functools
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
 import traceback
-from typing import Any
+from collections import OrderedDict
+from pathlib import Path
+from types import MappingProxyType
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import dash
-import dash_bootstrap_components as dbc
-from dash import html
-from dash.dependencies import Input, Output
+from dash import dcc, html
+from dash.dependencies import Input, Output, State
 from flask import Flask
 
+from src.utils.JobQueue import JobQueue
+from src.utils.VendorAssets import VENDOR_STYLESHEETS, VendorAssets
+
+
+class DataSnapshot(NamedTuple):
+    """Data loaded by a DashApp, replaced as a whole when the version changes."""
+
+    version: str
+    data: Mapping[str, Any]
+
+
+class CallbackCache:
+    """LRU cache of callback outputs, optionally backed by pickle files on disk.
+
+    The disk tier is shared by all processes using the same directory. Only
+    entries of the latest version are kept on disk.
+    """
+
+    def __init__(
+        self, max_entries: int = 128, directory: Optional[Union[str, Path]] = None
+    ) -> None:
+        self.max_entries = max_entries
+        self.directory = Path(directory) if directory is not None else None
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self._entries: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_version: Optional[str] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _prefix(self, version: str) -> str:
+        return hashlib.sha256(version.encode()).hexdigest()[:16]
+
+    def _path(self, version: str, key: str) -> Path:
+        assert self.directory is not None
+        key_digest = hashlib.sha256(key.encode()).hexdigest()
+        return self.directory / f"{self._prefix(version)}-{key_digest}.pickle"
+
+    def get(self, version: str, key: str) -> Tuple[bool, Any]:
+        """Look up an output, returns (found, value)."""
+        with self._lock:
+            if (version, key) in self._entries:
+                self._entries.move_to_end((version, key))
+                self.hits += 1
+                return True, self._entries[(version, key)]
+        if self.directory is not None:
+            try:
+                with open(self._path(version, key), "rb") as file:
+                    value = pickle.load(file)
+            except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+                pass
+            else:
+                self._put_memory(version, key, value)
+                with self._lock:
+                    self.disk_hits += 1
+                return True, value
+        with self._lock:
+            self.misses += 1
+        return False, None
+
+    def _put_memory(self, version: str, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[(version, key)] = value
+            self._entries.move_to_end((version, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def put(self, version: str, key: str, value: Any) -> None:
+        self._put_memory(version, key, value)
+        if self.directory is None:
+            return
+        path = self._path(version, key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        if self._disk_version != version:
+            # Outputs of older data versions are never requested again
+            self._disk_version = version
+            for old_path in self.directory.glob("*.pickle"):
+                if not old_path.name.startswith(f"{self._prefix(version)}-"):
+                    try:
+                        old_path.unlink()
+                    except OSError:
+                        pass
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
 
 class DashApp(metaclass=abc.ABCMeta):
-    def __init__(self, url_base: str, title: str = "NGTT Dashboard") -> None:
+    def __init__(
+        self,
+        url_base: str,
+        title: str = "NGTT Dashboard",
+        callback_cache_size: int = 128,
+        callback_cache_dir: Optional[str] = None,
+        job_queue: Optional[JobQueue] = None,
+        job_poll_interval: int = 500,
+        inline_layout: bool = True,
+        vendor_assets: Optional[VendorAssets] = None,
+    ) -> None:
         self.url_base = url_base
         self.title = title
+        self.callback_cache_size = callback_cache_size
+        self.callback_cache_dir = callback_cache_dir
+        self.job_queue = job_queue
+        self.job_poll_interval = job_poll_interval
+        self.inline_layout = inline_layout
+        self.vendor_assets = vendor_assets
+        # dcc.Store and dcc.Interval components of each background callback
+        self._background_components: Dict[str, List[Any]] = {}
+        self._layout: Optional[Tuple[str, Any]] = None
+        self.callback_caches: Dict[str, CallbackCache] = {}
+        self._snapshot: Optional[DataSnapshot] = None
+        self._data_lock = threading.Lock()
 
     def initialize(self, server: Flask) -> None:
-        external_stylesheets = [
-            "https://use.fontawesome.com/releases/v5.8.1/css/all.css",
-            dbc.themes.BOOTSTRAP,
-            "https://eds-static.equinor.com/font/equinor-font.css",
-        ]
+        if self.vendor_assets is not None:
+            external_stylesheets = self.vendor_assets.stylesheets()
+        else:
+            external_stylesheets = [cdn_url for cdn_url, _ in VENDOR_STYLESHEETS]
         self.app = dash.Dash(
             server=server,
             url_base_pathname=self.url_base,
             suppress_callback_exceptions=True,
             external_stylesheets=external_stylesheets,
             title=self.title,
+            # The vendored stylesheets are included above, not as app assets
+            assets_ignore=r"\.vendor\.css$",
         )
 
         self.app.layout = self.onload
 
-        @self.app.callback(Output("content", "children"), Input("_ignore", "value"))
+        @self.background_callback(
+            Output("content", "children"),
+            [Input("_ignore", "value")],
+            on_error=html.Pre,
+        )
         def data_loader_callback(layout: Any) -> Any:
             try:
-                self.load_data()
-                return self.get_html()
+                return self.get_layout(self.refresh_data())
             except Exception:
                 return html.Pre(traceback.format_exc())
 
     def onload(self) -> Any:
+        """The page layout, fully rendered if the data is already loaded.
+
+        Otherwise it's a placeholder, and data_loader_callback loads the data and
+        renders the content in a second request.
+        """
+        snapshot = self._warm_snapshot()
+        if snapshot is not None:
+            return html.Div(
+                [html.Div(id="content", children=self.get_layout(snapshot))]
+            )
         return html.Div(
             [html.Div(id="content", children="Loading data..."), html.Div(id="_ignore")]
+            + self._background_components.get("data_loader_callback", [])
         )
 
+    def _warm_snapshot(self) -> Optional[DataSnapshot]:
+        snapshot = self._snapshot
+        if not self.inline_layout or snapshot is None:
+            return None
+        try:
+            if snapshot.version == self.data_version():
+                return snapshot
+        except Exception:
+            traceback.print_exc()
+        return None
+
+    def get_layout(self, snapshot: DataSnapshot) -> Any:
+        """The content for a snapshot, built once per data version.
+
+        It includes the components used by the background callbacks of the content,
+        so that all inputs of a callback are rendered together.
+        """
+        layout = self._layout
+        if layout is None or layout[0] != snapshot.version:
+            components = [
+                component
+                for name, callback_components in self._background_components.items()
+                if name != "data_loader_callback"
+                for component in callback_components
+            ]
+            layout = (snapshot.version, [self.get_html(snapshot)] + components)
+            self._layout = layout
+        return layout[1]
+
+    def clientside_callback(
+        self,
+        function: str,
+        output: Output,
+        inputs: List[Input],
+        state: Optional[List[State]] = None,
+    ) -> None:
+        """Register a JavaScript callback, it runs in the browser without a request.
+
+        Use it for pure UI logic that doesn't need the data on the server.
+        """
+        self.app.clientside_callback(function, output, inputs, state or [])
+
+    def background_callback(
+        self,
+        output: Output,
+        inputs: List[Input],
+        inline_timeout: float = 0.2,
+        prepare: Optional[Callable[..., Any]] = None,
+        on_error: Optional[Callable[[str], Any]] = None,
+    ) -> Callable[[Callable], Callable]:
+        """Like app.callback, but runs the callback on the job queue.
+
+        The request returns once the job is queued, or finished within
+        inline_timeout seconds, and the browser polls for the result with a
+        dcc.Interval. Without a job queue the callback runs in the request.
+
+        prepare is called in the request with the input values, and returns the
+        arguments to call the callback with, or dash.no_update to leave the output
+        as it is without running a job.
+
+        A job that is lost, e.g. because its status file was removed, is submitted
+        again once. If it fails, or is lost again, the output is on_error called
+        with the error, or left as it is without on_error.
+        """
+
+        def arguments(values: Tuple[Any, ...]) -> Any:
+            return values if prepare is None else prepare(*values)
+
+        def decorator(func: Callable) -> Callable:
+            job_queue = self.job_queue
+            if job_queue is None:
+
+                @self.app.callback(output, inputs)
+                def run_inline(*values: Any) -> Any:
+                    args = arguments(values)
+                    if args is dash.no_update:
+                        return dash.no_update
+                    return func(*args)
+
+                return func
+            job_id = f"{func.__name__}-job"
+            poll_id = f"{func.__name__}-poll"
+            self._background_components[func.__name__] = [
+                dcc.Store(id=job_id),
+                dcc.Interval(
+                    id=poll_id, interval=self.job_poll_interval, disabled=True
+                ),
+            ]
+
+            @self.app.callback(
+                [output, Output(job_id, "data"), Output(poll_id, "disabled")],
+                inputs + [Input(poll_id, "n_intervals")],
+                [State(job_id, "data")],
+            )
+            def run(*args: Any) -> Tuple[Any, Any, Any]:
+                values, job = args[:-2], args[-1]
+                triggered = [
+                    item["prop_id"] for item in dash.callback_context.triggered
+                ]
+                if f"{poll_id}.n_intervals" in triggered:
+                    if not job:
+                        return dash.no_update, dash.no_update, True
+                    status = job_queue.status(job["id"])
+                    if status is None and not job.get("resubmitted"):
+                        print(
+                            f"Job {job['id']} of {func.__name__} was lost, resubmitting"
+                        )
+                        job = {
+                            "id": job_queue.submit(func, *arguments(values)),
+                            "resubmitted": True,
+                        }
+                        return dash.no_update, job, False
+                else:
+                    args = arguments(values)
+                    if args is dash.no_update:
+                        return dash.no_update, dash.no_update, dash.no_update
+                    job = {"id": job_queue.submit(func, *args)}
+                    status = job_queue.wait(job["id"], inline_timeout)
+                if status is not None and status["status"] in ("queued", "running"):
+                    return dash.no_update, job, False
+                job_queue.remove(job["id"])
+                if status is None or status["status"] == "error":
+                    # The error is printed by the job queue
+                    if on_error is None:
+                        return dash.no_update, None, True
+                    error = (
+                        status["error"]
+                        if status is not None
+                        else f"Job {job['id']} was lost"
+                    )
+                    return on_error(error), None, True
+                return json.loads(status["result"]), None, True
+
+            return func
+
+        return decorator
+
+    @property
+    def snapshot(self) -> DataSnapshot:
+        """The current data, loaded on first use.
+
+        Callbacks should read it once and use that snapshot throughout, it is never
+        modified, only replaced by refresh_data.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.refresh_data()
+        return snapshot
+
+    def refresh_data(self) -> DataSnapshot:
+        """Load the data if it is not loaded yet or its version has changed.
+
+        Only one thread per process loads at a time, the others wait for its result.
+        """
+        version = self.data_version()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._data_lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != version:
+                data = MappingProxyType(dict(self.load_data()))
+                loaded = self.loaded_version(data, version)
+                # A stale copy served while it is revalidated keeps the old version
+                if snapshot is None or snapshot.version != loaded:
+                    snapshot = DataSnapshot(loaded, data)
+                    self._snapshot = snapshot
+        return snapshot
+
+    def memoize(self, func: Callable) -> Callable:
+        """Decorator caching the outputs of a callback by its inputs and data version.
+
+        The callback is called with a snapshot followed by its inputs, and must only
+        depend on those. The snapshot is read once per call, so the output and its
+        cache key always belong to the same version. Pass a snapshot as the first
+        argument to compute for it, e.g. from another memoized function, otherwise
+        self.snapshot is used. Each callback gets its own CallbackCache, see
+        callback_cache_stats.
+        """
+        name = func.__name__
+        directory = None
+        if self.callback_cache_dir is not None:
+            app_digest = hashlib.sha256(self.url_base.encode()).hexdigest()[:16]
+            directory = Path(self.callback_cache_dir) / app_digest / name
+        cache = CallbackCache(self.callback_cache_size, directory)
+        self.callback_caches[name] = cache
+
+        @functools.wraps(func)
+        def wrapper(*args: Any) -> Any:
+            if args and isinstance(args[0], DataSnapshot):
+                snapshot, args = args[0], args[1:]
+            else:
+                snapshot = self.snapshot
+            key = json.dumps(args, sort_keys=True, default=str)
+            found, value = cache.get(snapshot.version, key)
+            if found:
+                return value
+            value = func(snapshot, *args)
+            cache.put(snapshot.version, key, value)
+            return value
+
+        return wrapper
+
+    def callback_cache_stats(self) -> Dict[str, Dict[str, float]]:
+        return {name: cache.stats() for name, cache in self.callback_caches.items()}
+
+    def data_version(self) -> str:
+        """Version of the data, the data is reloaded when it changes.
+
+        Override this to reload when the source data changes, by default the data
+        is loaded once per process.
+        """
+        return ""
+
+    def loaded_version(self, data: Mapping[str, Any], version: str) -> str:
+        """Version of the data returned by load_data, to label its snapshot with.
+
+        Defaults to the data_version seen before loading. Override this when the
+        loaded data can be older, e.g. a stale cache entry served while it is
+        revalidated, so the snapshot is reloaded once the new data is cached.
+        """
+        return version
+
     @abc.abstractmethod
-    def load_data(self) -> None:
+    def load_data(self) -> Mapping[str, Any]:
         pass
 
     @abc.abstractmethod
-    def get_html(self) -> Any:
+    def get_html(self, snapshot: DataSnapshot) -> Any:
         pass
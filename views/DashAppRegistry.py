@@ -0,0 +1,53 @@
+import threading
+from typing import Callable, Dict
+
+from flask import Flask
+
+from views.DashApp import DashApp
+
+
+class DashAppRegistry:
+    """Mounts DashApps on a Flask server and builds each one on its first request.
+
+    Every DashApp gets its own Flask server, created with its Dash instance the
+    first time a request arrives under its url_base. The route forwarding to it on
+    the main server is wrapped with decorator, e.g. login_required.
+    """
+
+    def __init__(
+        self, server: Flask, decorator: Callable[[Callable], Callable] = lambda f: f
+    ) -> None:
+        self.server = server
+        self.decorator = decorator
+        self._servers: Dict[str, Flask] = {}
+        self._lock = threading.Lock()
+
+    def register(self, dash_app: DashApp, preload: bool = False) -> None:
+        """Mount dash_app under its url_base, and build it now if preload is set."""
+        endpoint = f"dash_app:{dash_app.url_base}"
+
+        def forward(path: str = "") -> Callable:
+            # Flask runs a returned WSGI application with the current request
+            return self.get_server(dash_app).wsgi_app
+
+        forward.__name__ = endpoint
+        view = self.decorator(forward)
+        for rule in (dash_app.url_base, dash_app.url_base + "<path:path>"):
+            self.server.add_url_rule(rule, endpoint, view, methods=["GET", "POST"])
+        if preload:
+            self.get_server(dash_app)
+
+    def get_server(self, dash_app: DashApp) -> Flask:
+        """The Flask server of dash_app, initializing the DashApp if needed."""
+        server = self._servers.get(dash_app.url_base)
+        if server is not None:
+            return server
+        with self._lock:
+            server = self._servers.get(dash_app.url_base)
+            if server is None:
+                print(f"Initializing Dash app at {dash_app.url_base}")
+                # Same import name as the main server, so the assets folder matches
+                server = Flask(self.server.import_name, static_folder=None)
+                dash_app.initialize(server)
+                self._servers[dash_app.url_base] = server
+            return server
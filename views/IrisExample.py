@@ -1,16 +1,27 @@
-from typing import Any, Dict, List
+from typing import TYPE_CHECKING, Any, Dict, Mapping, Optional, Tuple, Union
 
+import dash
 import dash_bootstrap_components as dbc
-import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 from dash import dcc, html
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
 from flask.app import Flask
 from plotly.missing_ipywidgets import FigureWidget
 from sklearn.cluster import KMeans
 
 from src.utils.DataLoader import DataLoader
-from views.DashApp import DashApp
+from src.utils.downsampling import (
+    Range,
+    bin_scatter,
+    changes_range,
+    rounded_range,
+    visible_range,
+)
+from views.DashApp import DashApp, DataSnapshot
+
+if TYPE_CHECKING:
+    from src.utils.AsyncDataLoader import SyncDataLoader
 
 MIN_HEIGHT = 600
 LAYOUT = go.Layout(
@@ -21,47 +32,128 @@ LAYOUT = go.Layout(
     )
 )
 
+# Disable the option picked in the other dropdown, runs in the browser
+FILTER_OPTIONS = """
+function(value, options) {
+    return options.map(function(option) {
+        return Object.assign({}, option, {disabled: option.value === value});
+    });
+}
+"""
 
-class IrisExample(DashApp):
-    df = None
 
+class IrisExample(DashApp):
     def __init__(
-        self, url_base: str, options: Dict, data_loader: DataLoader, data_files: Dict
+        self,
+        url_base: str,
+        options: Dict,
+        data_loader: Union[DataLoader, "SyncDataLoader"],
+        data_files: Dict,
     ) -> None:
         self.options = options
+        # Point count above which the scatter plot is rendered with WebGL
+        self.webgl_threshold = self.options.get("webgl_threshold", 10000)
+        # Points per trace sent to the browser, denser data is aggregated on a grid
+        self.max_points = self.options.get("max_points", 5000)
         self.data_loader = data_loader
         self.data_files = data_files
-        super().__init__(url_base, self.options["name"])
+        super().__init__(
+            url_base,
+            self.options["name"],
+            self.options.get("callback_cache_size", 128),
+            self.options.get("callback_cache_dir"),
+            self.options.get("job_queue"),
+            self.options.get("job_poll_interval", 500),
+            self.options.get("inline_layout", True),
+            self.options.get("vendor_assets"),
+        )
 
     def initialize(self, server: Flask) -> None:
         super().initialize(server)
 
-        @self.app.callback(
+        @self.memoize
+        def fit_clusters(
+            snapshot: DataSnapshot, x: Any, y: Any, n_clusters: int
+        ) -> Tuple[Any, Any]:
+            km = KMeans(n_clusters=n_clusters)
+            km.fit(snapshot.data["iris"][[x, y]].to_numpy())
+            return km.labels_, km.cluster_centers_
+
+        def graph_inputs(
+            x: Any, y: Any, n_clusters: int, relayout_data: Optional[Dict]
+        ) -> Any:
+            triggered = [item["prop_id"] for item in dash.callback_context.triggered]
+            # e.g. {"autosize": True} on the first render, the figure stays the same
+            if triggered == ["cluster-graph.relayoutData"] and not changes_range(
+                relayout_data
+            ):
+                return dash.no_update
+            # The rounded window is part of the memoize key, so nearby zooms share it
+            return (
+                x,
+                y,
+                n_clusters,
+                rounded_range(visible_range(relayout_data, "xaxis")),
+                rounded_range(visible_range(relayout_data, "yaxis")),
+            )
+
+        def graph_error(error: str) -> FigureWidget:
+            # The last line of the traceback, the whole of it is in the server log
+            return go.Figure(layout={"title": error.strip().splitlines()[-1]})
+
+        @self.background_callback(
             Output("cluster-graph", "figure"),
             [
                 Input("x-variable", "value"),
                 Input("y-variable", "value"),
                 Input("cluster-count", "value"),
+                Input("cluster-graph", "relayoutData"),
             ],
+            prepare=graph_inputs,
+            on_error=graph_error,
         )
-        def make_graph(x: Any, y: Any, n_clusters: int) -> FigureWidget:
+        @self.memoize
+        def make_graph(
+            snapshot: DataSnapshot,
+            x: Any,
+            y: Any,
+            n_clusters: int,
+            x_range: Optional[Range],
+            y_range: Optional[Range],
+        ) -> FigureWidget:
             # minimal input validation, make sure there's at least one cluster
-            km = KMeans(n_clusters=max(n_clusters, 1))
-            df = self.iris.loc[:, [x, y]]
-            km.fit(df.values)
-            df["cluster"] = km.labels_
+            n_clusters = max(n_clusters, 1)
+            # The clusters are fitted on the same snapshot as the points shown
+            labels, centers = fit_clusters(snapshot, x, y, n_clusters)
+            values = snapshot.data["iris"][[x, y]].to_numpy()
 
-            centers = km.cluster_centers_
+            # Partition the points by cluster in one pass instead of a mask per cluster
+            order = np.argsort(labels, kind="stable")
+            counts = np.bincount(labels, minlength=n_clusters)
+            clusters = np.split(values[order], np.cumsum(counts)[:-1])
 
+            # Only send the visible window, aggregated to at most max_points per trace
+            binned = [
+                bin_scatter(
+                    points[:, 0], points[:, 1], self.max_points, x_range, y_range
+                )
+                for points in clusters
+            ]
+
+            # WebGL keeps rendering fast in the browser for large point counts
+            total = sum(len(cluster_x) for cluster_x, _, _ in binned)
+            scatter = go.Scattergl if total > self.webgl_threshold else go.Scatter
             data = [
-                go.Scatter(
-                    x=df.loc[df.cluster == c, x],
-                    y=df.loc[df.cluster == c, y],
+                scatter(
+                    x=cluster_x,
+                    y=cluster_y,
+                    customdata=cluster_counts,
+                    hovertemplate="%{x}, %{y} (%{customdata} points)",
                     mode="markers",
                     marker={"size": 8},
                     name="Cluster {}".format(c),
                 )
-                for c in range(n_clusters)
+                for c, (cluster_x, cluster_y, cluster_counts) in enumerate(binned)
             ]
 
             data.append(
@@ -74,33 +166,54 @@ class IrisExample(DashApp):
                 )
             )
 
-            layout = {"xaxis": {"title": x}, "yaxis": {"title": y}}
+            # uirevision keeps the zoom when the figure is replaced for a new window
+            layout = {
+                "xaxis": {"title": x},
+                "yaxis": {"title": y},
+                "uirevision": f"{x}_{y}",
+            }
 
             return go.Figure(data=data, layout=layout)
 
-        # make sure that x and y values can't be the same variable
-        def filter_options(v: Any) -> List[Dict]:
-            """Disable option v"""
-            return [
-                {"label": col, "value": col, "disabled": col == v}
-                for col in self.iris.columns
-            ]
+        # make sure that x and y values can't be the same variable, the
+        # functionality is the same for both dropdowns, so we reuse FILTER_OPTIONS
+        self.clientside_callback(
+            FILTER_OPTIONS,
+            Output("x-variable", "options"),
+            [Input("y-variable", "value")],
+            [State("x-variable", "options")],
+        )
+        self.clientside_callback(
+            FILTER_OPTIONS,
+            Output("y-variable", "options"),
+            [Input("x-variable", "value")],
+            [State("y-variable", "options")],
+        )
 
-        # functionality is the same for both dropdowns, so we reuse filter_options
-        self.app.callback(
-            Output("x-variable", "options"), [Input("y-variable", "value")]
-        )(filter_options)
-        self.app.callback(
-            Output("y-variable", "options"), [Input("x-variable", "value")]
-        )(filter_options)
-
-    def load_data(self) -> None:
-        self.iris = pd.read_csv(
-            self.data_loader.get(**self.data_files["iris"]), index_col=0
+    def data_version(self) -> str:
+        iris = self.data_files["iris"]
+        return self.data_loader.version(
+            iris["account_url"],
+            iris["container"],
+            iris["filename"],
+            iris.get("ttl"),
+            iris.get("backend", "azure"),
         )
-        print(self.iris)
 
-    def get_html(self) -> Any:
+    def load_data(self) -> Mapping[str, Any]:
+        data_file = dict(self.data_files["iris"])
+        # The first column of iris.csv is the row index
+        read_options = {"index_col": 0, **data_file.pop("read_options", {})}
+        iris = self.data_loader.get_dataframe(**data_file, read_options=read_options)
+        print(iris)
+        return {"iris": iris}
+
+    def loaded_version(self, data: Mapping[str, Any], version: str) -> str:
+        # The ETag of the blob version get_dataframe actually served
+        return data["iris"].attrs.get("etag", version)
+
+    def get_html(self, snapshot: DataSnapshot) -> Any:
+        iris = snapshot.data["iris"]
         return dbc.Container(
             [
                 html.H1("Iris k-means clustering"),
@@ -117,7 +230,7 @@ class IrisExample(DashApp):
                                                 id="x-variable",
                                                 options=[
                                                     {"label": col, "value": col}
-                                                    for col in self.iris.columns
+                                                    for col in iris.columns
                                                 ],
                                                 value="sepal length (cm)",
                                             ),
@@ -130,7 +243,7 @@ class IrisExample(DashApp):
                                                 id="y-variable",
                                                 options=[
                                                     {"label": col, "value": col}
-                                                    for col in self.iris.columns
+                                                    for col in iris.columns
                                                 ],
                                                 value="sepal width (cm)",
                                             ),